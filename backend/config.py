@@ -10,13 +10,11 @@ load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Log API key status for debugging
+# Log API key status for debugging (opt in with CONFIG_DEBUG; key material is never logged)
 import logging
 logger = logging.getLogger(__name__)
-logger.info(f"Config: OpenAI API Key loaded: {'Yes' if OPENAI_API_KEY else 'No'}")
-if OPENAI_API_KEY:
-    logger.info(f"Config: API Key length: {len(OPENAI_API_KEY)} characters")
-    logger.info(f"Config: API Key prefix: {OPENAI_API_KEY[:10]}..." if len(OPENAI_API_KEY) > 10 else "Config: API Key too short")
+if os.getenv("CONFIG_DEBUG"):
+    logger.debug(f"Config: OpenAI API Key loaded: {'Yes' if OPENAI_API_KEY else 'No'}")
 
 
 # Base directory paths
@@ -39,6 +37,33 @@ CSV_PATHS = {
     "enquiries": DATA_DIR / "enquiries.csv"
 }
 
+# CSV columns parsed as text instead of type-inferred (IDs and phone numbers must not turn into numbers)
+TABLE_SCHEMAS = {
+    "agents": {"agent_id": "str", "isv_id": "str"},
+    "auth": {"auth_id": "str", "user_id": "str", "email": "str", "password": "str"},
+    "capabilities_mapping": {"agent_id": "str", "by_capability_id": "str"},
+    "demo_assets": {"agent_id": "str", "demo_asset_id": "str"},
+    "deployments": {"by_capability_id": "str", "service_id": "str"},
+    "docs": {"agent_id": "str", "doc_id": "str"},
+    "isv": {"isv_id": "str", "isv_mob_no": "str"},
+    "reseller": {"reseller_id": "str", "reseller_mob_no": "str"},
+    "client": {"client_id": "str", "client_mob_no": "str"},
+    "agent_requirements": {"requirement_id": "str", "session_id": "str", "user_id": "str"},
+    "chat_history": {"session_id": "str", "user_id": "str"},
+    "enquiries": {"enquiry_id": "str", "session_id": "str", "user_id": "str", "phone": "str"}
+}
+
+# Connection pool size: the cap scales with CPU cores and a few connections are opened up front
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", str(max(4, 2 * (os.cpu_count() or 1)))))
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", str(min(4, DB_POOL_MAX))))
+
+# In-memory table cache lifetime. A cached frame is refreshed at once after writes made by this process, but
+# another worker's (or an external) write to PostgreSQL only shows up once the TTL runs out, so PostgreSQL
+# defaults to 0 (every read goes to the database) to stay correct with several uvicorn workers. Raise it only
+# for a single worker or if reads may lag other writers by that many seconds. CSV reads also check the file's
+# modification time, so the cache stays on there.
+_DEFAULT_TABLE_CACHE_TTL = "0" if os.getenv("DATA_SOURCE", "postgres") == "postgres" else "30"
+
 # Database configuration
 DATABASE_CONFIG = {
     # PostgreSQL connection URL (preferred - takes precedence over individual parameters)
@@ -51,8 +76,24 @@ DATABASE_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     
     # Connection pool settings
-    "min_connections": 1,
-    "max_connections": 10,
+    "min_connections": DB_POOL_MIN,
+    "max_connections": DB_POOL_MAX,
+    
+    # Single-row inserts (chat history, enquiries, requirements) that queue up behind an in-flight insert
+    # to the same table are written together, up to this many rows per INSERT (1 = off)
+    "insert_batch_max_size": int(os.getenv("INSERT_BATCH_MAX_SIZE", "500")),
+    
+    # Comma-separated tables whose writes commit without waiting for the WAL flush; a crash can drop their
+    # last acknowledged writes, so only list tables whose rows can be lost (empty = all commits synchronous)
+    "async_commit_tables": [table.strip() for table in os.getenv("DB_ASYNC_COMMIT_TABLES", "chat_history").split(",") if table.strip()],
+    
+    # Run single-row INSERT/UPDATE statements as server-side prepared statements (1 = on). Leave off behind
+    # a transaction-pooling pgbouncer (such as pooled Render or Neon endpoints): consecutive transactions can
+    # land on different server sessions there, which don't have the statement prepared
+    "prepared_statements": os.getenv("DB_PREPARED_STATEMENTS", "0") == "1",
+    
+    # Table reads are served from memory for this long (0 = off); see _DEFAULT_TABLE_CACHE_TTL for the trade-off
+    "table_cache_ttl_seconds": float(os.getenv("TABLE_CACHE_TTL_SECONDS", _DEFAULT_TABLE_CACHE_TTL)),
     
     # Data source preference (csv or postgres)
     "data_source": os.getenv("DATA_SOURCE", "postgres")  # "csv" or "postgres"
@@ -68,6 +109,31 @@ API_CONFIG = {
 }
 
 
+# Chat settings
+CHAT_CONFIG = {
+    # Conversation memory is an LRU capped at this many sessions
+    "max_sessions": int(os.getenv("CHAT_MAX_SESSIONS", "10000")),
+    # Sessions idle for longer than this are dropped from conversation memory
+    "session_ttl_seconds": float(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600")),
+    # Oldest exchanges are left out of a prompt once the history passes this many (estimated) tokens
+    "history_token_budget": int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000")),
+    # Retries on 429, 5xx, timeouts and dropped connections (exponential backoff with jitter)
+    "openai_max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+    # Client-side throttling of async OpenAI calls (0 requests per minute = no rate cap)
+    "openai_concurrency": int(os.getenv("OPENAI_CONCURRENCY", "20")),
+    "openai_requests_per_minute": int(os.getenv("OPENAI_RPM", "0")),
+    # Identical queries repeated in a session within this window reuse the previous response
+    "dedupe_ttl_seconds": float(os.getenv("CHAT_DEDUPE_TTL_SECONDS", "1.0")),
+    "dedupe_max_entries": int(os.getenv("CHAT_DEDUPE_MAX_ENTRIES", "1024")),
+    # Results of completed requirements batches are kept this long so polling again doesn't save them twice
+    "completed_batch_ttl_seconds": float(os.getenv("CHAT_COMPLETED_BATCH_TTL_SECONDS", "86400")),
+    "completed_batch_max_entries": int(os.getenv("CHAT_COMPLETED_BATCH_MAX_ENTRIES", "256")),
+    # Explore mode sends full details for at most this many relevant agents once the catalog outgrows the budget
+    "explore_top_k": int(os.getenv("CHAT_EXPLORE_TOP_K", "10")),
+    "explore_context_max_tokens": int(os.getenv("CHAT_EXPLORE_CONTEXT_MAX_TOKENS", "8000"))
+}
+
+
 # S3 Configuration
 S3_CONFIG = {
     "bucket_name": os.getenv("S3_BUCKET_NAME", ""),
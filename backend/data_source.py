@@ -3,94 +3,286 @@ Simple data source module for Agents Marketplace
 Supports both CSV files and PostgreSQL database
 """
 import pandas as pd
+import orjson
+import charset_normalizer
 import psycopg2
+import psycopg2.extras
 from psycopg2 import pool
+from psycopg2.extras import RealDictCursor, execute_values
 from typing import Dict, List, Optional, Union
 from pathlib import Path
 import logging
 import os
 from datetime import datetime
-from config import CSV_PATHS, DATABASE_CONFIG
+from config import CSV_PATHS, DATABASE_CONFIG, TABLE_SCHEMAS
 import threading
+import csv
+import tempfile
+import io
+from contextlib import contextmanager
+from operator import itemgetter
+import time
+import hashlib
+import re
+from urllib.parse import urlparse, parse_qsl, quote, urlencode, urlunparse
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging - root logging is configured by the application (see main.py)
 logger = logging.getLogger(__name__)
 
+# Bulk inserts of at least this many rows use COPY; an unquoted \N in the COPY stream stands for NULL
+_COPY_MIN_ROWS = 50
+_COPY_NULL = "\\N"
+
+# Writes to these tables commit without waiting for the WAL flush (DB_ASYNC_COMMIT_TABLES). A database crash
+# can lose the last fraction of a second of acknowledged writes to them, but never corrupts or half-applies
+# them, so only chat history is listed by default; leads, deployments and accounts keep synchronous commits.
+_ASYNC_COMMIT_TABLES = frozenset(DATABASE_CONFIG["async_commit_tables"])
+
+# $1, $2, ... placeholders of statements that can run as server-side prepared statements
+_NUMBERED_PLACEHOLDER = re.compile(r"\$\d+")
+
+# In PostgreSQL these tables draw new IDs from a sequence named <table>_<id column>_seq: table -> (id column, prefix)
+_ID_SEQUENCES = {
+    "agent_requirements": ("requirement_id", "req"),
+    "enquiries": ("enquiry_id", "enquiry"),
+}
+
+def _row_values(rows: List[Dict], columns: List[str]) -> List[tuple]:
+    """Pull the given columns out of each row dict as a tuple, with None for keys a row doesn't have"""
+    if not columns:
+        return [() for _ in rows]
+    # itemgetter fetches every column in one C call; it returns a bare value rather than a tuple for a single column
+    getter = itemgetter(*columns)
+    single = len(columns) == 1
+    column_set = set(columns)
+    values = []
+    for row in rows:
+        if row.keys() >= column_set:
+            value = getter(row)
+            values.append((value,) if single else value)
+        else:
+            values.append(tuple(row.get(col) for col in columns))
+    return values
+
+def _decode_legacy_csv(raw: bytes) -> tuple:
+    """Decode CSV bytes that aren't UTF-8 using the encoding detected from a sample, with latin-1 as the last resort"""
+    match = charset_normalizer.from_bytes(raw[:32768]).best()
+    for encoding in ([match.encoding] if match else []) + ["cp1252"]:
+        try:
+            return raw.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            continue  # The sample didn't represent the whole file
+    # latin-1 maps every byte, so this always succeeds
+    return raw.decode("latin-1"), "latin-1"
+
+def _with_query_params(url: str, params: Dict[str, str]) -> str:
+    """Return the URL with the given query parameters set (existing ones are kept unless overridden)"""
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    query.update(params)
+    # libpq decodes %XX escapes but not "+", so spaces must be percent-encoded
+    return urlunparse(parsed._replace(query=urlencode(query, quote_via=quote)))
+
+def _stamp(record: Dict, *keys: str, **fields) -> Dict:
+    """Set each of the given keys to one shared current timestamp and apply any fixed fields"""
+    now = datetime.now().isoformat()
+    for key in keys:
+        record[key] = now
+    record.update(fields)
+    return record
+
+class _InsertBatcher:
+    """
+    Group commit for single-row inserts arriving from concurrent request threads
+    
+    A caller that finds no write in progress writes its row straight away. Rows queued by other
+    threads while that write runs are then written together with one multi-row INSERT and commit,
+    so nobody waits unless a write is already in flight; every caller still gets its own result.
+    Each write is done by the caller whose row is oldest in it, which then hands the next batch to
+    the first caller still queued, so no request thread writes more than its own batch.
+    """
+    
+    def __init__(self, insert_one, insert_many, max_batch_size: int = 500):
+        self.insert_one = insert_one
+        self.insert_many = insert_many
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._pending: List[list] = []  # [row, wake-up event, result, promoted to write the next batch] per waiting caller
+        self._flushing = False  # A batch is being written; while True, queued callers wait their turn
+    
+    def submit(self, row: Dict) -> bool:
+        """Queue a row and block until the batch holding it has been written"""
+        entry = [row, threading.Event(), False, False]
+        with self._lock:
+            self._pending.append(entry)
+            lead = not self._flushing
+            self._flushing = True
+        if not lead:
+            entry[1].wait()
+            if not entry[3]:
+                return entry[2]  # Written by another caller's batch
+        # This row is now first in the queue, so the batch written next includes it
+        self._flush_one()
+        return entry[2]
+    
+    def _flush_one(self):
+        """Write the oldest queued rows as one batch, then wake their callers and the next batch's writer"""
+        with self._lock:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+        try:
+            self._write(batch)
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(batch)} rows: {e}")  # Results stay False
+        finally:
+            with self._lock:
+                next_writer = self._pending[0] if self._pending else None
+                if next_writer is None:
+                    self._flushing = False
+                else:
+                    next_writer[3] = True
+            for entry in batch:
+                entry[1].set()
+            if next_writer is not None:
+                next_writer[1].set()
+    
+    def _write(self, batch: List[list]):
+        """Insert a batch, one statement per distinct set of columns"""
+        groups: Dict[frozenset, List[list]] = {}
+        for entry in batch:
+            groups.setdefault(frozenset(entry[0]), []).append(entry)
+        for entries in groups.values():
+            if len(entries) == 1:
+                entries[0][2] = self.insert_one(entries[0][0])
+            elif self.insert_many([entry[0] for entry in entries]):
+                for entry in entries:
+                    entry[2] = True
+            else:
+                # One bad row fails the whole statement, so retry them one by one to give each caller its own result
+                for entry in entries:
+                    entry[2] = self.insert_one(entry[0])
+
 class DataSource:
     """Simple data source class that can read from CSV or PostgreSQL"""
     
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __new__(cls):
+        """Return the one shared instance, so every DataSource() uses the same caches and connection pool"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+    
     def __init__(self):
+        # Repeated DataSource() calls return the shared instance, which is set up only once
+        if self._initialized:
+            return
+        
         self.data_source = DATABASE_CONFIG["data_source"]
+        if self.data_source not in ("csv", "postgres"):
+            raise ValueError(f"Unknown data source: {self.data_source}")
+        self._initialized = True
+        
         self.csv_paths = CSV_PATHS
         self.db_config = DATABASE_CONFIG
         self._connection_pool = None
+        self._dsn = None  # Normalized DATABASE_URL, built on first pool initialization
+        self._connection_checked_at: Dict[int, float] = {}  # id(connection) -> monotonic time it last passed SELECT 1
+        self._prepared_statements: Dict[tuple, set] = {}  # (id(connection), backend PID) -> names PREPAREd on that session (guarded by _lock)
         self._lock = threading.Lock()
+        self._table_versions: Dict[str, int] = {}  # Bumped on every write made through this data source
+        self._records_cache: Dict[tuple, tuple] = {}  # (table_name, columns) -> (version, records)
+        self._capabilities_lookup_cache = None  # (version, {agent_id: "cap1, cap2"})
+        self._group_index_cache: Dict[tuple, tuple] = {}  # (table_name, column) -> (frame, {value: row positions})
+        self._row_index_cache: Dict[tuple, tuple] = {}  # (table_name, column) -> (frame, {value: [row dicts]})
+        self._id_counters: Dict[tuple, tuple] = {}  # (table_name, id_column, prefix) -> (frame, highest ID number in it)
+        self._table_cache: Dict[str, tuple] = {}  # table_name -> (loaded_at, version, DataFrame shared by all readers)
+        self._table_cache_ttl = DATABASE_CONFIG["table_cache_ttl_seconds"]
+        self._insert_batchers: Dict[str, _InsertBatcher] = {}  # table_name -> group commit for concurrent single-row inserts
+        self._columns_cache: Dict[str, List[str]] = {}  # table_name -> PostgreSQL column names in table order
+        self._csv_cache: Dict[str, tuple] = {}  # table_name -> ((st_mtime_ns, st_size), DataFrame parsed from that file)
+        self._csv_encodings: Dict[str, str] = {}  # table_name -> encoding the file was last decoded with
+        self._csv_write_locks: Dict[str, threading.Lock] = {}  # table_name -> lock held across a CSV write's read-modify-write
+        self._sequences_ready = set()  # Tables whose PostgreSQL ID sequence has been checked and caught up this process
+        self._health_cache = None  # (monotonic time, result) of the last healthy check, reused by frequent probes
+        
+        # Write paths for the configured backend, resolved once so the public save/update/delete methods don't branch per call
+        if self.data_source == "csv":
+            self._save_row = self._save_rows = self._insert_row = self._save_csv_data
+            self._update_row = self._update_csv_data
+            self._delete_rows = self._delete_csv_data
+        else:
+            self._save_row = self._save_postgres_data
+            self._save_rows = self._bulk_insert_postgres_data
+            self._insert_row = self._insert_postgres_row  # Group-committed with concurrent saves to the same table
+            self._update_row = self._update_postgres_data
+            self._delete_rows = self._delete_postgres_data
         
         # Initialize connection pool if using PostgreSQL
         if self.data_source == "postgres":
             self._init_connection_pool()
     
+    def _build_dsn(self, db_url: str) -> str:
+        """Normalize DATABASE_URL into the DSN the pool connects with (URL scheme, cloud SSL, timeout and keepalives)"""
+        # Handle JDBC format URLs (jdbc:postgresql://...)
+        if db_url.startswith("jdbc:postgresql://"):
+            db_url = self._convert_jdbc_to_postgresql_url(db_url)
+            logger.info("Converted JDBC URL to PostgreSQL format")
+        
+        # Handle postgres:// URLs (convert to postgresql://)
+        elif db_url.startswith("postgres://"):
+            db_url = db_url.replace("postgres://", "postgresql://", 1)
+        
+        parsed = urlparse(db_url)
+        params = dict(parse_qsl(parsed.query, keep_blank_values=True))
+        
+        # Render/cloud databases need SSL
+        host = parsed.hostname or ""
+        if any(cloud_host in host for cloud_host in ("render.com", "heroku.com", "neon.tech")):
+            if params.get("sslmode") in (None, "prefer"):
+                params["sslmode"] = "require"
+                logger.info("Using SSL mode (require) for cloud database")
+        
+        # Connection timeout and keepalive settings, unless the URL sets them
+        params.setdefault("connect_timeout", "10")
+        params.setdefault("keepalives", "1")
+        params.setdefault("keepalives_idle", "30")
+        
+        return _with_query_params(db_url, params)
+    
     def _init_connection_pool(self):
         """Initialize PostgreSQL connection pool"""
+        if self._connection_pool is not None:
+            return  # Already initialized
+        
         try:
             # Get connection parameters
             if "DATABASE_URL" in self.db_config and self.db_config["DATABASE_URL"]:
-                db_url = self.db_config["DATABASE_URL"]
-                
-                # Handle JDBC format URLs (jdbc:postgresql://...)
-                if db_url.startswith("jdbc:postgresql://"):
-                    db_url = self._convert_jdbc_to_postgresql_url(db_url)
-                    logger.info("Converted JDBC URL to PostgreSQL format")
-                
-                # Handle postgres:// URLs (convert to postgresql://)
-                elif db_url.startswith("postgres://"):
-                    db_url = db_url.replace("postgres://", "postgresql://", 1)
-                
-                # Add SSL parameters for Render/cloud databases
-                if "render.com" in db_url or "heroku.com" in db_url or "neon.tech" in db_url:
-                    # Check if sslmode is already in the URL
-                    if "sslmode=" not in db_url:
-                        if "?" in db_url:
-                            db_url += "&sslmode=require"
-                        else:
-                            db_url += "?sslmode=require"
-                        logger.info("Added SSL mode (require) for cloud database")
-                    elif "sslmode=prefer" in db_url:
-                        # Replace prefer with require for Render
-                        db_url = db_url.replace("sslmode=prefer", "sslmode=require")
-                        logger.info("Changed SSL mode from prefer to require for Render database")
-                
-                # Create connection pool with URL
-                # For Render, we need sslmode=require with proper connection settings
-                # Add connection timeout and keepalive settings if not present
-                if "connect_timeout=" not in db_url:
-                    db_url += "&connect_timeout=10" if "?" in db_url else "?connect_timeout=10"
-                if "keepalives=" not in db_url:
-                    db_url += "&keepalives=1"
-                if "keepalives_idle=" not in db_url:
-                    db_url += "&keepalives_idle=30"
+                # The URL is normalized once; re-initializations reuse the same DSN
+                if self._dsn is None:
+                    self._dsn = self._build_dsn(self.db_config["DATABASE_URL"])
+                db_url = self._dsn
                 
                 try:
                     self._connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                        minconn=1,
-                        maxconn=10,
+                        minconn=self.db_config["min_connections"],
+                        maxconn=self.db_config["max_connections"],
                         dsn=db_url
                     )
                 except Exception as ssl_error:
                     # If SSL connection fails, try with sslmode=require without certificate verification
                     if "SSL" in str(ssl_error) or "ssl" in str(ssl_error).lower():
                         logger.warning(f"SSL connection failed with sslmode=require, trying sslmode=require with no verification: {str(ssl_error)}")
-                        # Replace or add sslmode=require
-                        if "sslmode=" in db_url:
-                            db_url = db_url.split("?")[0] + "?sslmode=require&sslcert=&sslkey=&sslrootcert=&sslcrl="
-                        else:
-                            db_url = db_url + "?sslmode=require&sslcert=&sslkey=&sslrootcert=&sslcrl="
+                        # Same DSN with sslmode=require and certificate files cleared
+                        db_url = _with_query_params(db_url, {"sslmode": "require", "sslcert": "", "sslkey": "", "sslrootcert": "", "sslcrl": ""})
                         
                         try:
                             self._connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                                minconn=1,
-                                maxconn=10,
+                                minconn=self.db_config["min_connections"],
+                                maxconn=self.db_config["max_connections"],
                                 dsn=db_url
                             )
                             logger.info("Connection pool initialized with SSL (no cert verification)")
@@ -102,8 +294,8 @@ class DataSource:
             else:
                 # Create connection pool with individual parameters
                 self._connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                    minconn=1,
-                    maxconn=10,
+                    minconn=self.db_config["min_connections"],
+                    maxconn=self.db_config["max_connections"],
                     host=self.db_config["host"],
                     port=self.db_config["port"],
                     database=self.db_config["database"],
@@ -111,7 +303,10 @@ class DataSource:
                     password=self.db_config["password"]
                 )
             
-            logger.info("PostgreSQL connection pool initialized successfully")
+            logger.info(f"PostgreSQL connection pool initialized successfully ({self.db_config['min_connections']}-{self.db_config['max_connections']} connections)")
+            self._register_type_adapters()
+            self._ensure_indexes()
+            self._ensure_sequences()
             
         except Exception as e:
             logger.error(f"Error initializing connection pool: {str(e)}")
@@ -125,6 +320,63 @@ class DataSource:
             self._connection_pool = None
             # Don't raise here - let the app start, but pool will be None
     
+    def _register_type_adapters(self):
+        """Register UUID and orjson-backed JSONB type casters for every connection (process-wide)"""
+        psycopg2.extras.register_uuid()
+        psycopg2.extras.register_default_jsonb(globally=True, loads=orjson.loads)
+    
+    def _ensure_indexes(self):
+        """Create the indexes hot lookups rely on if they are missing (best effort; needs CREATE rights)"""
+        conn = None
+        try:
+            conn = self._connection_pool.getconn()
+            cursor = conn.cursor()
+            # Login and user lookups filter auth by email
+            cursor.execute('CREATE INDEX IF NOT EXISTS auth_email_idx ON auth ("email")')
+            # Chat history is saved, updated and deleted by session
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history ("session_id")')
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            logger.warning(f"Could not ensure database indexes: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                self._connection_pool.putconn(conn)
+    
+    def _ensure_sequences(self):
+        """Set up the ID sequences at startup; a table whose sequence cannot be set up fails its saves until it can"""
+        for table_name, (id_column, _) in _ID_SEQUENCES.items():
+            conn = None
+            try:
+                conn = self._connection_pool.getconn()
+                cursor = conn.cursor()
+                self._prepare_sequence(cursor, table_name)
+                conn.commit()
+                cursor.close()
+                self._sequences_ready.add(table_name)
+            except Exception as e:
+                logger.error(f"Could not set up ID sequence {table_name}_{id_column}_seq (create it or grant CREATE on the schema); new {table_name} rows cannot be saved: {e}")
+                if conn:
+                    conn.rollback()
+            finally:
+                if conn:
+                    self._connection_pool.putconn(conn)
+    
+    def _prepare_sequence(self, cursor, table_name: str):
+        """Create a table's ID sequence if it is missing and move it past every ID already in the table"""
+        id_column, prefix = _ID_SEQUENCES[table_name]
+        sequence_name = f"{table_name}_{id_column}_seq"
+        # Only create a missing sequence: CREATE ... IF NOT EXISTS needs CREATE rights even when it already exists
+        cursor.execute("SELECT to_regclass(%s)", (sequence_name,))
+        if cursor.fetchone()[0] is None:
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence_name}")
+        max_num = self._max_id_number_postgres(cursor, table_name, id_column, prefix)
+        cursor.execute(f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {sequence_name}")
+        if max_num > cursor.fetchone()[0]:
+            cursor.execute("SELECT setval(%s, %s)", (sequence_name, max_num))
+    
     def _get_connection(self):
         """Get PostgreSQL database connection from pool"""
         # If pool is not initialized, try to initialize it
@@ -137,7 +389,7 @@ class DataSource:
                 raise Exception("Connection pool not initialized and initialization failed")
         
         try:
-            return self._connection_pool.getconn()
+            return self._validate_connection(self._connection_pool.getconn())
         except Exception as e:
             logger.error(f"Error getting connection from pool: {e}")
             # Try to re-initialize pool if connection fails
@@ -155,6 +407,92 @@ class DataSource:
                 logger.error(f"Error getting connection after re-initialization: {retry_e}")
                 raise
     
+    def _validate_connection(self, conn):
+        """Replace a pooled connection that has gone dead (checked with SELECT 1 at most every 30 seconds)"""
+        now = time.monotonic()
+        if not conn.closed and now - self._connection_checked_at.get(id(conn), 0) < 30:
+            return conn
+        
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()  # Leave the connection idle rather than inside the check's transaction
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            logger.warning(f"Discarding dead pooled connection: {e}")
+            self._connection_checked_at.pop(id(conn), None)
+            self._forget_prepared_statements(conn)
+            self._connection_pool.putconn(conn, close=True)
+            conn = self._connection_pool.getconn()
+        
+        self._connection_checked_at[id(conn)] = now
+        return conn
+    
+    @contextmanager
+    def _conn(self):
+        """Check out a pooled connection, rolling back on error and always returning it to the pool"""
+        conn = self._get_connection()
+        try:
+            yield conn
+        except Exception:
+            self._health_cache = None  # Re-check for real on the next probe
+            try:
+                conn.rollback()
+                # Start this session's prepared statements over so the server and _prepared_statements can't disagree
+                if self._forget_prepared_statements(conn):
+                    with conn.cursor() as cursor:
+                        cursor.execute("DEALLOCATE ALL")
+                    conn.commit()
+            except Exception:
+                pass  # Broken connection; the pool will still take it back
+            raise
+        finally:
+            self._return_connection(conn)
+    
+    def _relax_commit(self, cursor, table_name: str):
+        """Let the current write transaction commit without waiting for the WAL flush if its table allows it"""
+        if table_name in _ASYNC_COMMIT_TABLES:
+            cursor.execute("SET LOCAL synchronous_commit = off")
+    
+    def _execute_prepared(self, cursor, sql: str, values: List):
+        """
+        Run a statement through a server-side prepared statement, PREPAREd once per pooled session,
+        or as a plain parameterized query unless DB_PREPARED_STATEMENTS is on
+        Args:
+            cursor: Cursor of a pooled connection
+            sql: Statement with $1, $2, ... placeholders, each used once and in order
+            values: Parameter values in placeholder order
+        """
+        if not self.db_config["prepared_statements"]:
+            cursor.execute(_NUMBERED_PLACEHOLDER.sub("%s", sql), values)
+            return
+        
+        conn = cursor.connection
+        session_key = (id(conn), conn.get_backend_pid())
+        name = "stmt_" + hashlib.md5(sql.encode()).hexdigest()[:16]
+        with self._lock:
+            prepared = self._prepared_statements.setdefault(session_key, set())
+            needs_prepare = name not in prepared
+        if needs_prepare:
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            with self._lock:
+                prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(values))})", values)
+    
+    def _forget_prepared_statements(self, conn) -> bool:
+        """Drop the record of statements prepared on a connection; returns True if there were any"""
+        try:
+            session_key = (id(conn), conn.get_backend_pid())
+        except Exception:
+            session_key = None
+        with self._lock:
+            prepared = self._prepared_statements.pop(session_key, None)
+            # A dead connection can't report its PID, so also clear anything else recorded under its id
+            for key in [key for key in self._prepared_statements if key[0] == id(conn)]:
+                del self._prepared_statements[key]
+        return bool(prepared)
+    
     def _return_connection(self, conn):
         """Return connection to pool"""
         if self._connection_pool and conn:
@@ -163,73 +501,288 @@ class DataSource:
             except Exception as e:
                 logger.error(f"Error returning connection to pool: {e}")
         
+    def _bump_table_version(self, table_name: str):
+        """Record a write to a table so version-keyed caches rebuild"""
+        with self._lock:
+            self._table_versions[table_name] = self._table_versions.get(table_name, 0) + 1
+            self._table_cache.pop(table_name, None)
+            self._csv_cache.pop(table_name, None)
+            for cache_key in [key for key in self._group_index_cache if key[0] == table_name]:
+                del self._group_index_cache[cache_key]
+            for cache_key in [key for key in self._row_index_cache if key[0] == table_name]:
+                del self._row_index_cache[cache_key]
+            for cache_key in [key for key in self._id_counters if key[0] == table_name]:
+                del self._id_counters[cache_key]
+    
+    def get_table_version(self, *table_names: str) -> tuple:
+        """
+        Get a cheap token that changes whenever any of the given tables may have changed
+        Args:
+            table_names: Names of the tables the caller's cache is derived from
+        Returns:
+            Hashable version token; for CSV it also tracks file modification times
+        """
+        version = []
+        for table_name in table_names:
+            version.append(self._table_versions.get(table_name, 0))
+            if self.data_source == "csv" and table_name in self.csv_paths:
+                try:
+                    version.append(self.csv_paths[table_name].stat().st_mtime_ns)
+                except OSError:
+                    version.append(None)
+        return tuple(version)
+    
     def get_table_data(self, table_name: str) -> pd.DataFrame:
         """
         Get data from specified table
         Args:
             table_name: Name of the table (agents, demo_assets, etc.)
         Returns:
-            pandas DataFrame with table data
+            pandas DataFrame with table data (shared between callers, so filter it rather than modify it)
         """
+        version = self.get_table_version(table_name)
+        cached = self._get_cached_table(table_name, version)
+        if cached is not None:
+            return cached
+        
         if self.data_source == "csv":
-            return self._get_csv_data(table_name)
+            df = self._get_csv_data(table_name)
         elif self.data_source == "postgres":
-            return self._get_postgres_data(table_name)
+            df = self._get_postgres_data(table_name)
         else:
             raise ValueError(f"Unknown data source: {self.data_source}")
+        
+        # Empty frames are not cached since a failed read also comes back empty
+        if not df.empty and self._table_cache_ttl > 0:
+            with self._lock:
+                self._table_cache[table_name] = (time.monotonic(), version, df)
+        return df
+    
+    def _get_cached_table(self, table_name: str, version: tuple) -> Optional[pd.DataFrame]:
+        """Get the cached frame for a table if it is still fresh, otherwise None"""
+        # Reads within the TTL reuse the last frame unless this process wrote to the table (or its CSV changed)
+        with self._lock:
+            cached = self._table_cache.get(table_name)
+        if cached is not None and cached[1] == version and time.monotonic() - cached[0] < self._table_cache_ttl:
+            return cached[2]
+        return None
+    
+    def _query(self, table_name: str, where: Dict, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Get the rows of a table where every column equals the given value
+        Args:
+            table_name: Name of the table (agents, demo_assets, etc.)
+            where: Column name -> value pairs that must all match
+            limit: Maximum number of rows to return (all if not given)
+        Returns:
+            pandas DataFrame with the matching rows
+        """
+        # A fresh cached frame is filtered in memory; otherwise PostgreSQL applies the filter using its indexes
+        df = self._get_cached_table(table_name, self.get_table_version(table_name))
+        if df is None:
+            if self.data_source == "postgres":
+                return self._query_postgres_data(table_name, where, limit)
+            df = self.get_table_data(table_name)
+        
+        if any(column not in df.columns for column in where):
+            return df.iloc[0:0]
+        if len(where) == 1:
+            # Single-column lookups (by ID or agent_id) are hash lookups into a per-frame index
+            (column, value), = where.items()
+            positions = self._column_groups(table_name, df, column).get(value)
+            if positions is None:
+                return df.iloc[0:0]
+            rows = df.iloc[positions]
+            return rows if limit is None else rows.head(limit)
+        mask = pd.Series(True, index=df.index)
+        for column, value in where.items():
+            mask &= df[column] == value
+        return df[mask] if limit is None else df[mask].head(limit)
+    
+    def _column_groups(self, table_name: str, df: pd.DataFrame, column: str) -> Dict:
+        """Get {value: row positions} for a column of a table frame, built once per loaded frame"""
+        cache_key = (table_name, column)
+        cached = self._group_index_cache.get(cache_key)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        groups = df.groupby(column, sort=False).indices
+        self._group_index_cache[cache_key] = (df, groups)
+        return groups
+    
+    def _column_rows(self, table_name: str, df: pd.DataFrame, column: str) -> Dict:
+        """Get {value: [row dicts]} for a column of a table frame, built once per loaded frame"""
+        cache_key = (table_name, column)
+        cached = self._row_index_cache.get(cache_key)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        records = df.to_dict('records')
+        rows = {value: [records[i] for i in positions] for value, positions in self._column_groups(table_name, df, column).items()}
+        self._row_index_cache[cache_key] = (df, rows)
+        return rows
+    
+    def _query_one(self, table_name: str, where: Dict) -> Optional[Dict]:
+        """Get the first row of a table matching every column = value pair as a dict, or None"""
+        df = self._get_cached_table(table_name, self.get_table_version(table_name))
+        if df is None:
+            # Without a fresh cached frame, PostgreSQL rows come back as dicts and skip DataFrame construction
+            if self.data_source == "postgres":
+                return self._query_one_postgres(table_name, where)
+            df = self.get_table_data(table_name)
+        
+        if not where or any(column not in df.columns for column in where):
+            return None
+        
+        # Hash lookup on the first column (the ID or email), then check any remaining conditions on the few candidates
+        (column, value), *conditions = where.items()
+        for row in self._column_rows(table_name, df, column).get(value, ()):
+            if all(row[other] == other_value for other, other_value in conditions):
+                return dict(row)  # Callers may modify the row, so never hand out the cached dict
+        return None
+    
+    def get_table_records(self, table_name: str, columns: tuple, defaults: Optional[Dict] = None) -> List[tuple]:
+        """
+        Get selected columns of a table as a list of row tuples, cached until the table changes
+        Args:
+            table_name: Name of the table (agents, demo_assets, etc.)
+            columns: Column names, in the order the tuple fields should have
+            defaults: Values to use for columns missing from the table (None if not given)
+        Returns:
+            List of tuples with missing values (NaN) replaced by ''
+        """
+        version = self.get_table_version(table_name)
+        cache_key = (table_name, columns)
+        cached = self._records_cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        df = self.get_table_data(table_name)
+        defaults = defaults or {}
+        arrays = []
+        for column in columns:
+            if column in df.columns:
+                arrays.append(df[column].fillna('').to_numpy())
+            else:
+                arrays.append([defaults.get(column)] * len(df))
+        records = list(zip(*arrays)) if not df.empty else []
+        
+        self._records_cache[cache_key] = (version, records)
+        return records
     
     def _get_csv_data(self, table_name: str) -> pd.DataFrame:
-        """Read data from CSV file with multiple encoding attempts"""
+        """Read data from CSV file, decoding as UTF-8 or a detected encoding (parsed frames are reused until the file changes)"""
         if table_name not in self.csv_paths:
             raise ValueError(f"Unknown table: {table_name}")
         
         csv_path = self.csv_paths[table_name]
         
-        if not csv_path.exists():
+        try:
+            stat = csv_path.stat()
+        except FileNotFoundError:
             logger.warning(f"CSV file not found: {csv_path}")
             return pd.DataFrame()
         
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._csv_cache.get(table_name)
+        if cached is not None and cached[0] == file_key:
+            return cached[1]
         
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(csv_path, encoding=encoding, quoting=1)  # quoting=1 handles multiline fields
-                logger.info(f"Loaded {len(df)} rows from {table_name} using {encoding} encoding")
-                return df
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                logger.error(f"Error reading CSV {table_name} with {encoding}: {e}")
-                continue
+        # Read the file once and decode in memory; other encodings are detected rather than tried by re-parsing
+        try:
+            raw = csv_path.read_bytes()
+        except OSError as e:
+            logger.error(f"Error reading CSV {table_name}: {e}")
+            return pd.DataFrame()
+        try:
+            text, encoding = raw.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            text, encoding = _decode_legacy_csv(raw)
         
-        logger.error(f"Failed to read CSV {table_name} with any encoding")
-        return pd.DataFrame()
+        try:
+            # quoting=1 handles multiline fields; ID columns are read as text so they skip type inference
+            df = pd.read_csv(io.StringIO(text), quoting=1, dtype=TABLE_SCHEMAS.get(table_name), low_memory=False)
+        except Exception as e:
+            logger.error(f"Error reading CSV {table_name} with {encoding}: {e}")
+            return pd.DataFrame()
+        
+        logger.info(f"Loaded {len(df)} rows from {table_name} using {encoding} encoding")
+        with self._lock:
+            self._csv_encodings[table_name] = encoding
+            self._csv_cache[table_name] = (file_key, df)
+        return df
+    
+    def _read_postgres_frame(self, conn, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
+        """Run a SELECT on a pooled connection and build a DataFrame straight from the fetched rows"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            columns = [column.name for column in cursor.description]
+            # coerce_float matches what pd.read_sql did for NUMERIC columns
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+        finally:
+            cursor.close()
     
     def _get_postgres_data(self, table_name: str) -> pd.DataFrame:
         """Read data from PostgreSQL database using connection pool"""
-        conn = None
+        # Table names are interpolated into the SQL, so only known tables are accepted
+        if table_name not in self.csv_paths:
+            raise ValueError(f"Unknown table: {table_name}")
+        
         try:
             # Get connection from pool
-            conn = self._get_connection()
-            
-            # Read data (suppress pandas warning about psycopg2 connection)
-            import warnings
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
+            with self._conn() as conn:
+                # Read data
                 query = f"SELECT * FROM {table_name}"
-                df = pd.read_sql(query, conn)
-            
-            logger.info(f"Loaded {len(df)} rows from PostgreSQL table {table_name}")
-            return df
-            
+                df = self._read_postgres_frame(conn, query)
+                
+                logger.info(f"Loaded {len(df)} rows from PostgreSQL table {table_name}")
+                return df
+                
         except Exception as e:
             logger.error(f"Error reading from PostgreSQL {table_name}: {e}")
             return pd.DataFrame()
-        finally:
-            # Always return connection to pool
-            if conn:
-                self._return_connection(conn)
+    
+    def _query_postgres_data(self, table_name: str, where: Dict, limit: Optional[int] = None) -> pd.DataFrame:
+        """Read matching rows from PostgreSQL with a parameterized WHERE clause"""
+        # Table names are interpolated into the SQL, so only known tables are accepted
+        if table_name not in self.csv_paths:
+            raise ValueError(f"Unknown table: {table_name}")
+        
+        try:
+            with self._conn() as conn:
+                conditions = ' AND '.join(f'"{column}" = %s' for column in where)
+                query = f'SELECT * FROM {table_name} WHERE {conditions}'
+                if limit is not None:
+                    query += f' LIMIT {int(limit)}'
+                
+                df = self._read_postgres_frame(conn, query, tuple(where.values()))
+                
+                return df
+                
+        except Exception as e:
+            logger.error(f"Error querying PostgreSQL {table_name}: {e}")
+            return pd.DataFrame()
+    
+    def _query_one_postgres(self, table_name: str, where: Dict) -> Optional[Dict]:
+        """Read the first matching row from PostgreSQL as a dict"""
+        # Table names are interpolated into the SQL, so only known tables are accepted
+        if table_name not in self.csv_paths:
+            raise ValueError(f"Unknown table: {table_name}")
+        
+        try:
+            with self._conn() as conn:
+                conditions = ' AND '.join(f'"{column}" = %s' for column in where)
+                query = f'SELECT * FROM {table_name} WHERE {conditions} LIMIT 1'
+                
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, tuple(where.values()))
+                    row = cursor.fetchone()
+                
+                return dict(row) if row else None
+                
+        except Exception as e:
+            logger.error(f"Error querying PostgreSQL {table_name}: {e}")
+            return None
     
     def _convert_jdbc_to_postgresql_url(self, jdbc_url: str) -> str:
         """Convert JDBC URL to PostgreSQL connection string format"""
@@ -265,130 +818,278 @@ class DataSource:
             logger.error(f"Error converting JDBC URL: {e}")
             raise
     
+    def _get_table_columns(self, cursor, table_name: str) -> List[str]:
+        """Get a PostgreSQL table's column names, looked up once per process (the schema doesn't change at runtime)"""
+        with self._lock:
+            columns = self._columns_cache.get(table_name)
+        if columns is not None:
+            return columns
+        
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+            (table_name,)
+        )
+        columns = [row[0] for row in cursor.fetchall()]
+        if columns:
+            with self._lock:
+                self._columns_cache[table_name] = columns
+        return columns
+    
     def _save_postgres_data(self, table_name: str, data: Dict) -> bool:
         """Save data to PostgreSQL database using connection pool"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Get existing data to get column names
-            df = self._get_postgres_data(table_name)
-            if not df.empty:
-                columns = list(df.columns)
-            else:
-                # If table is empty, use the keys from data
-                columns = list(data.keys())
-            
-            # Build INSERT query
-            valid_columns = [col for col in columns if col in data]
-            placeholders = ', '.join(['%s'] * len(valid_columns))
-            column_names = ', '.join([f'"{col}"' for col in valid_columns])
-            
-            query = f"INSERT INTO {table_name} ({column_names}) VALUES ({placeholders})"
-            values = [data[col] for col in valid_columns]
-            
-            cursor.execute(query, values)
-            conn.commit()
-            cursor.close()
-            
-            logger.info(f"Saved data to PostgreSQL table {table_name}")
-            return True
-            
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                self._relax_commit(cursor, table_name)
+                
+                # Get column names (fall back to the keys from data if the table's columns can't be looked up)
+                columns = self._get_table_columns(cursor, table_name) or list(data.keys())
+                
+                # Build INSERT query
+                valid_columns = [col for col in columns if col in data]
+                placeholders = ', '.join(f'${i}' for i in range(1, len(valid_columns) + 1))
+                column_names = ', '.join([f'"{col}"' for col in valid_columns])
+                
+                # Prepared per column set, so repeated saves skip parsing and planning on the server
+                query = f"INSERT INTO {table_name} ({column_names}) VALUES ({placeholders})"
+                values = _row_values([data], valid_columns)[0]
+                
+                self._execute_prepared(cursor, query, list(values))
+                conn.commit()
+                cursor.close()
+                self._bump_table_version(table_name)
+                
+                logger.info(f"Saved data to PostgreSQL table {table_name}")
+                return True
+                
         except Exception as e:
             logger.error(f"Error saving data to PostgreSQL {table_name}: {e}")
             return False
-        finally:
-            # Always return connection to pool
-            if conn:
-                self._return_connection(conn)
+    
+    def _insert_postgres_row(self, table_name: str, data: Dict) -> bool:
+        """Insert one row, sharing a multi-row INSERT with rows other threads are saving to the same table"""
+        if DATABASE_CONFIG["insert_batch_max_size"] <= 1:
+            return self._save_postgres_data(table_name, data)
+        
+        batcher = self._insert_batchers.get(table_name)
+        if batcher is None:
+            with self._lock:
+                batcher = self._insert_batchers.get(table_name)
+                if batcher is None:
+                    batcher = _InsertBatcher(
+                        lambda row: self._save_postgres_data(table_name, row),
+                        lambda rows: self._bulk_insert_postgres_data(table_name, rows),
+                        max_batch_size=DATABASE_CONFIG["insert_batch_max_size"]
+                    )
+                    self._insert_batchers[table_name] = batcher
+        return batcher.submit(data)
+    
+    def _bulk_insert_postgres_data(self, table_name: str, rows: List[Dict]) -> bool:
+        """Insert many rows into a PostgreSQL table with a multi-row INSERT (COPY for large batches) and a single commit"""
+        if not rows:
+            return True
+        
+        try:
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                self._relax_commit(cursor, table_name)
+                
+                # Get column names (fall back to the keys from the rows if the table's columns can't be looked up)
+                columns = self._get_table_columns(cursor, table_name) or list(dict.fromkeys(key for row in rows for key in row))
+                
+                # Build INSERT query covering every column any row provides
+                valid_columns = [col for col in columns if any(col in row for row in rows)]
+                column_names = ', '.join([f'"{col}"' for col in valid_columns])
+                
+                values = _row_values(rows, valid_columns)
+                
+                if len(values) >= _COPY_MIN_ROWS:
+                    # Large batches stream through COPY, which skips per-statement parsing entirely
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer, lineterminator="\n")
+                    writer.writerows(tuple(_COPY_NULL if value is None else value for value in row) for row in values)
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {table_name} ({column_names}) FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')", buffer)
+                else:
+                    query = f"INSERT INTO {table_name} ({column_names}) VALUES %s"
+                    execute_values(cursor, query, values, page_size=500)
+                conn.commit()
+                cursor.close()
+                self._bump_table_version(table_name)
+                
+                logger.info(f"Saved {len(rows)} rows to PostgreSQL table {table_name}")
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error bulk saving data to PostgreSQL {table_name}: {e}")
+            return False
     
     def _update_postgres_data(self, table_name: str, key_column: str, key_value: str, data: Dict) -> bool:
         """Update data in PostgreSQL database using connection pool"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Build UPDATE query
-            set_clauses = []
-            values = []
-            for key, value in data.items():
-                if key != key_column:  # Don't update the key column itself
-                    set_clauses.append(f'"{key}" = %s')
-                    values.append(value)
-            
-            if not set_clauses:
-                logger.warning("No fields to update")
-                return False
-            
-            query = f'UPDATE {table_name} SET {", ".join(set_clauses)} WHERE "{key_column}" = %s'
-            values.append(key_value)
-            
-            cursor.execute(query, values)
-            conn.commit()
-            cursor.close()
-            
-            logger.info(f"Updated data in PostgreSQL table {table_name} where {key_column}={key_value}")
-            return True
-            
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                self._relax_commit(cursor, table_name)
+                
+                # Build UPDATE query
+                set_clauses = []
+                values = []
+                for key, value in data.items():
+                    if key != key_column:  # Don't update the key column itself
+                        values.append(value)
+                        set_clauses.append(f'"{key}" = ${len(values)}')
+                
+                if not set_clauses:
+                    logger.warning("No fields to update")
+                    return False
+                
+                # RETURNING tells us whether a row matched without reading the table again
+                values.append(key_value)
+                query = f'UPDATE {table_name} SET {", ".join(set_clauses)} WHERE "{key_column}" = ${len(values)} RETURNING 1'
+                
+                self._execute_prepared(cursor, query, values)
+                updated = cursor.fetchone() is not None
+                conn.commit()
+                cursor.close()
+                
+                if not updated:
+                    logger.error(f"Row not found in PostgreSQL table {table_name} where {key_column}={key_value}")
+                    return False
+                
+                self._bump_table_version(table_name)
+                logger.info(f"Updated data in PostgreSQL table {table_name} where {key_column}={key_value}")
+                return True
+                
         except Exception as e:
             logger.error(f"Error updating data in PostgreSQL {table_name}: {e}")
             return False
-        finally:
-            # Always return connection to pool
-            if conn:
-                self._return_connection(conn)
     
     def _delete_postgres_data(self, table_name: str, key_column: str, key_value: str) -> bool:
         """Delete data from PostgreSQL database using connection pool"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            query = f'DELETE FROM {table_name} WHERE "{key_column}" = %s'
-            cursor.execute(query, (key_value,))
-            conn.commit()
-            cursor.close()
-            
-            logger.info(f"Deleted data from PostgreSQL table {table_name} where {key_column}={key_value}")
-            return True
-            
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                self._relax_commit(cursor, table_name)
+                
+                # Row-level delete; rowcount says whether anything matched
+                query = f'DELETE FROM {table_name} WHERE "{key_column}" = %s'
+                cursor.execute(query, (key_value,))
+                deleted = cursor.rowcount > 0
+                conn.commit()
+                cursor.close()
+                
+                if not deleted:
+                    logger.error(f"Row not found in PostgreSQL table {table_name} where {key_column}={key_value}")
+                    return False
+                
+                self._bump_table_version(table_name)
+                logger.info(f"Deleted data from PostgreSQL table {table_name} where {key_column}={key_value}")
+                return True
+                
         except Exception as e:
             logger.error(f"Error deleting data from PostgreSQL {table_name}: {e}")
             return False
-        finally:
-            # Always return connection to pool
-            if conn:
-                self._return_connection(conn)
+    
+    def _csv_write_lock(self, table_name: str) -> threading.Lock:
+        """Get the lock held across a CSV write's read-modify-write, so concurrent writers (worker threads) can't lose each other's changes"""
+        lock = self._csv_write_locks.get(table_name)
+        if lock is None:
+            with self._lock:
+                lock = self._csv_write_locks.setdefault(table_name, threading.Lock())
+        return lock
+    
+    def _write_csv_file(self, table_name: str, df: pd.DataFrame):
+        """Rewrite a table's CSV atomically (temp file + rename), so readers never see a half-written file"""
+        csv_path = self.csv_paths[table_name]
+        # A unique temp file next to the CSV, so the rename stays on one filesystem
+        fd, tmp_path = tempfile.mkstemp(dir=csv_path.parent, prefix=csv_path.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                if all(dtype.kind in "Obiuf" for dtype in df.dtypes):
+                    # Plain object/number columns format the same through csv.writer, which skips pandas' per-column formatting pass
+                    values = df.astype(object)
+                    if df.isna().values.any():
+                        values = values.where(df.notna(), None)
+                    writer = csv.writer(f, lineterminator="\n")
+                    writer.writerow(df.columns)
+                    writer.writerows(values.itertuples(index=False, name=None))
+                else:
+                    df.to_csv(f, index=False, lineterminator="\n")
+            # mkstemp creates the file owner-only; keep the permissions the CSV already had
+            if csv_path.exists():
+                os.chmod(tmp_path, csv_path.stat().st_mode & 0o777)
+            os.replace(tmp_path, csv_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _delete_csv_data(self, table_name: str, key_column: str, key_value: str) -> bool:
+        """Delete rows from a CSV file; returns False if no row matched"""
+        try:
+            with self._csv_write_lock(table_name):
+                # Get existing data (reused from the CSV cache when the file hasn't changed)
+                df = self._get_csv_data(table_name)
+                mask = df[key_column] == key_value if key_column in df.columns else None
+                if mask is None or not mask.any():
+                    logger.error(f"Row not found in {table_name} where {key_column}={key_value}")
+                    return False
+                
+                self._write_csv_file(table_name, df[~mask])
+                self._bump_table_version(table_name)
+                logger.info(f"Deleted rows from CSV {table_name} where {key_column}={key_value}")
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error deleting CSV data {table_name}: {e}")
+            return False
+    
+    def _can_append_csv_rows(self, table_name: str, df: pd.DataFrame, rows: List[Dict]) -> bool:
+        """Check whether rows can be appended to a table's CSV as-is (existing header covers them, file is UTF-8 and newline-terminated)"""
+        if df.empty or self._csv_encodings.get(table_name) != "utf-8":
+            return False
+        columns = set(df.columns)
+        if any(key not in columns for row in rows for key in row):
+            return False  # New columns mean the header has to be rewritten
+        try:
+            with open(self.csv_paths[table_name], "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) == b"\n"
+        except OSError:
+            return False
     
     def _save_csv_data(self, table_name: str, data: Union[Dict, List[Dict]]) -> bool:
         """Save data to CSV file"""
         try:
-            if table_name not in self.csv_paths:
-                logger.error(f"Unknown table: {table_name}")
-                return False
-            
-            csv_path = self.csv_paths[table_name]
-            
-            # Get existing data
-            df = self._get_csv_data(table_name)
-            
-            # Convert to DataFrame
-            if isinstance(data, list):
-                new_df = pd.DataFrame(data)
-            else:
-                new_df = pd.DataFrame([data])
-            
-            # Append
-            updated_df = pd.concat([df, new_df], ignore_index=True)
-            
-            # Save
-            updated_df.to_csv(csv_path, index=False)
-            logger.info(f"Saved data to CSV {table_name}")
-            return True
-            
+            with self._csv_write_lock(table_name):
+                if table_name not in self.csv_paths:
+                    logger.error(f"Unknown table: {table_name}")
+                    return False
+                
+                csv_path = self.csv_paths[table_name]
+                rows = data if isinstance(data, list) else [data]
+                
+                # Get existing data
+                df = self._get_csv_data(table_name)
+                
+                if self._can_append_csv_rows(table_name, df, rows):
+                    # Append just the new rows instead of rewriting the whole file
+                    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+                        writer = csv.DictWriter(f, fieldnames=list(df.columns), lineterminator="\n")
+                        writer.writerows(rows)
+                else:
+                    # Convert to DataFrame
+                    new_df = pd.DataFrame(rows)
+                    
+                    # Append
+                    updated_df = pd.concat([df, new_df], ignore_index=True)
+                    
+                    # Save
+                    self._write_csv_file(table_name, updated_df)
+                self._bump_table_version(table_name)
+                logger.info(f"Saved data to CSV {table_name}")
+                return True
+                
         except Exception as e:
             logger.error(f"Error saving CSV data {table_name}: {e}")
             return False
@@ -396,31 +1097,32 @@ class DataSource:
     def _update_csv_data(self, table_name: str, key_column: str, key_value: str, data: Dict) -> bool:
         """Update data in CSV file"""
         try:
-            if table_name not in self.csv_paths:
-                logger.error(f"Unknown table: {table_name}")
-                return False
-            
-            csv_path = self.csv_paths[table_name]
-            
-            # Get existing data
-            df = self._get_csv_data(table_name)
-            
-            # Find the row to update
-            mask = df[key_column] == key_value
-            if not mask.any():
-                logger.error(f"Row not found in {table_name} where {key_column}={key_value}")
-                return False
-            
-            # Update the row
-            for key, value in data.items():
-                if key in df.columns:
-                    df.loc[mask, key] = value
-            
-            # Save
-            df.to_csv(csv_path, index=False)
-            logger.info(f"Updated CSV {table_name}")
-            return True
-            
+            with self._csv_write_lock(table_name):
+                if table_name not in self.csv_paths:
+                    logger.error(f"Unknown table: {table_name}")
+                    return False
+                
+                # Get existing data (parsed once; reused from the CSV cache when the file hasn't changed)
+                df = self._get_csv_data(table_name)
+                
+                # Find the row to update
+                mask = df[key_column] == key_value
+                if not mask.any():
+                    logger.error(f"Row not found in {table_name} where {key_column}={key_value}")
+                    return False
+                
+                # Update the row on a copy, since the parsed frame is shared with readers
+                df = df.copy()
+                for key, value in data.items():
+                    if key in df.columns:
+                        df.loc[mask, key] = value
+                
+                # Save
+                self._write_csv_file(table_name, df)
+                self._bump_table_version(table_name)
+                logger.info(f"Updated CSV {table_name}")
+                return True
+                
         except Exception as e:
             logger.error(f"Error updating CSV data {table_name}: {e}")
             return False
@@ -448,11 +1150,7 @@ class DataSource:
     def get_isv_by_id(self, isv_id: str) -> Dict:
         """Get ISV by ID"""
         try:
-            isv_df = self.get_table_data("isv")
-            isv_row = isv_df[isv_df['isv_id'] == isv_id]
-            if not isv_row.empty:
-                return isv_row.iloc[0].to_dict()
-            return {}
+            return self._query_one("isv", {"isv_id": isv_id}) or {}
         except Exception as e:
             logger.error(f"Error getting ISV by ID {isv_id}: {str(e)}")
             return {}
@@ -471,353 +1169,229 @@ class DataSource:
     
     def get_agent_by_id(self, agent_id: str) -> Optional[Dict]:
         """Get specific agent by ID"""
-        agents_df = self.get_agents()
-        agent = agents_df[agents_df['agent_id'] == agent_id]
-        
-        if agent.empty:
-            return None
-        
-        return agent.iloc[0].to_dict()
+        return self._query_one("agents", {"agent_id": agent_id})
     
     def get_demo_assets_by_agent(self, agent_id: str) -> pd.DataFrame:
         """Get demo assets for specific agent"""
-        assets_df = self.get_demo_assets()
-        return assets_df[assets_df['agent_id'] == agent_id]
+        return self._query("demo_assets", {"agent_id": agent_id})
     
     def get_deployments_by_capability(self, capability_id: str) -> pd.DataFrame:
         """Get deployment services for specific capability"""
-        deployments_df = self.get_deployments()
-        return deployments_df[deployments_df['by_capability_id'] == capability_id]
+        return self._query("deployments", {"by_capability_id": capability_id})
     
     def get_capabilities_by_agent(self, agent_id: str) -> pd.DataFrame:
         """Get capabilities for specific agent"""
+        return self._query("capabilities_mapping", {"agent_id": agent_id})
+    
+    def get_capabilities_lookup(self) -> Dict[str, str]:
+        """Get each agent's capabilities joined into one string, cached until the mapping changes"""
+        version = self.get_table_version("capabilities_mapping")
+        cached = self._capabilities_lookup_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
         mapping_df = self.get_capabilities_mapping()
-        return mapping_df[mapping_df['agent_id'] == agent_id]
+        lookup = {}
+        if not mapping_df.empty and 'agent_id' in mapping_df.columns and 'by_capability' in mapping_df.columns:
+            capabilities = mapping_df.dropna(subset=['by_capability'])
+            capabilities = capabilities[capabilities['by_capability'].astype(str) != '']
+            lookup = (
+                capabilities.groupby('agent_id', sort=False)['by_capability']
+                .agg(lambda values: ', '.join(values.astype(str)))
+                .to_dict()
+            )
+        
+        self._capabilities_lookup_cache = (version, lookup)
+        return lookup
     
     def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate user with email and password"""
-        auth_df = self.get_auth()
-        user = auth_df[(auth_df['email'] == email) & (auth_df['password'] == password) & (auth_df['is_active'] == 'yes')]
-        
-        if user.empty:
-            return None
-        
-        return user.iloc[0].to_dict()
+        return self._query_one("auth", {"email": email, "password": password, "is_active": "yes"})
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
-        auth_df = self.get_auth()
-        user = auth_df[auth_df['email'] == email]
-        
-        if user.empty:
-            return None
-        
-        return user.iloc[0].to_dict()
+        return self._query_one("auth", {"email": email})
     
     def get_agents_by_isv(self, isv_id: str) -> pd.DataFrame:
         """Get all agents for a specific ISV"""
-        agents_df = self.get_agents()
-        return agents_df[agents_df['isv_id'] == isv_id]
+        return self._query("agents", {"isv_id": isv_id})
     
     def save_isv_data(self, isv_data: Dict) -> bool:
         """Save new ISV data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("isv", isv_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("isv", isv_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving ISV data: {e}")
-            return False
+        return self._save_row("isv", isv_data)
     
     def save_auth_data(self, auth_data: Dict) -> bool:
         """Save new auth data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("auth", auth_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("auth", auth_data)
+        return self._save_row("auth", auth_data)
+    
+    def _next_sequential_id(self, table_name: str, id_column: str, prefix: str) -> str:
+        """
+        Generate the ID after the highest numbered "<prefix>_NNN" ID in a table
+        Args:
+            table_name: Name of the table holding the IDs
+            id_column: Column with the IDs
+            prefix: ID prefix (isv, agent, etc.)
+        Returns:
+            Next ID, zero-padded to at least three digits
+        """
+        if self.data_source == "postgres":
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                max_num = self._max_id_number_postgres(cursor, table_name, id_column, prefix)
+                cursor.close()
+        else:
+            df = self.get_table_data(table_name)
+            # The highest number is worked out once per loaded frame; a write or a file change loads a new frame
+            counter_key = (table_name, id_column, prefix)
+            cached = self._id_counters.get(counter_key)
+            if cached is not None and cached[0] is df:
+                max_num = cached[1]
             else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving auth data: {e}")
-            return False
+                max_num = 0
+                if id_column in df.columns:
+                    # IDs are "<prefix>_<digits>", so the number is whatever follows the last underscore
+                    ids = df[id_column].dropna().astype(str)
+                    ids = ids[ids.str.startswith(f"{prefix}_")]
+                    numbers = pd.to_numeric(ids.str.rsplit('_', n=1).str[-1], errors='coerce').dropna()
+                    if not numbers.empty:
+                        max_num = int(numbers.max())
+                self._id_counters[counter_key] = (df, max_num)
+        
+        return f"{prefix}_{max_num + 1:03d}"
+    
+    def _max_id_number_postgres(self, cursor, table_name: str, id_column: str, prefix: str) -> int:
+        """Highest number among a table's "<prefix>_NNN" IDs (0 if none); only the maximum comes back over the wire"""
+        cursor.execute(
+            f'SELECT COALESCE(MAX(substring("{id_column}" from %s)::int), 0) FROM {table_name}',
+            (f"^{prefix}_(\\d+)$",)
+        )
+        return cursor.fetchone()[0]
+    
+    def _next_sequence_id(self, table_name: str) -> str:
+        """
+        Generate the next "<prefix>_NNN" ID from a table's PostgreSQL sequence (safe across workers, no table scan)
+        Raises if the sequence is missing and cannot be created, since any fallback could hand out an ID twice
+        Args:
+            table_name: Name of a table in _ID_SEQUENCES
+        Returns:
+            Next ID, zero-padded to at least three digits
+        """
+        id_column, prefix = _ID_SEQUENCES[table_name]
+        sequence_name = f"{table_name}_{id_column}_seq"
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            if table_name not in self._sequences_ready:
+                # Setup at startup failed; try again in case the sequence has been created since
+                self._prepare_sequence(cursor, table_name)
+                conn.commit()
+                self._sequences_ready.add(table_name)
+            
+            cursor.execute("SELECT nextval(%s)", (sequence_name,))
+            next_num = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        
+        return f"{prefix}_{next_num:03d}"
     
     def get_next_isv_id(self) -> str:
         """Generate next sequential ISV ID"""
         try:
-            isv_df = self.get_isvs()
-            if isv_df.empty:
-                return "isv_001"
-            
-            # Extract numeric part and find max
-            existing_ids = isv_df['isv_id'].str.extract(r'isv_(\d+)')[0].astype(int)
-            next_num = existing_ids.max() + 1
-            
-            return f"isv_{next_num:03d}"
+            return self._next_sequential_id("isv", "isv_id", "isv")
         except Exception as e:
             logger.error(f"Error generating ISV ID: {e}")
-            return f"isv_{len(isv_df) + 1:03d}"
+            return f"isv_{len(self.get_isvs()) + 1:03d}"
     
     def get_next_auth_id(self) -> str:
         """Generate next sequential Auth ID"""
         try:
-            auth_df = self.get_auth()
-            if auth_df.empty:
-                return "auth_001"
-            
-            # Extract numeric part and find max
-            existing_ids = auth_df['auth_id'].str.extract(r'auth_(\d+)')[0].astype(int)
-            next_num = existing_ids.max() + 1
-            
-            return f"auth_{next_num:03d}"
+            return self._next_sequential_id("auth", "auth_id", "auth")
         except Exception as e:
             logger.error(f"Error generating Auth ID: {e}")
-            return f"auth_{len(auth_df) + 1:03d}"
+            return f"auth_{len(self.get_auth()) + 1:03d}"
     
     def update_isv_data(self, isv_id: str, updated_data: Dict) -> bool:
         """Update existing ISV data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("isv", "isv_id", isv_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("isv", "isv_id", isv_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating ISV data: {e}")
-            return False
+        return self._update_row("isv", "isv_id", isv_id, updated_data)
     
     def get_reseller_by_id(self, reseller_id: str) -> Optional[Dict]:
         """Get specific reseller by ID"""
-        resellers_df = self.get_resellers()
-        reseller = resellers_df[resellers_df['reseller_id'] == reseller_id]
-        
-        if reseller.empty:
-            return None
-        
-        return reseller.iloc[0].to_dict()
+        return self._query_one("reseller", {"reseller_id": reseller_id})
     
     def save_reseller_data(self, reseller_data: Dict) -> bool:
         """Save new reseller data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("reseller", reseller_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("reseller", reseller_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving reseller data: {e}")
-            return False
+        return self._save_row("reseller", reseller_data)
     
     def update_reseller_data(self, reseller_id: str, updated_data: Dict) -> bool:
         """Update existing reseller data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("reseller", "reseller_id", reseller_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("reseller", "reseller_id", reseller_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating reseller data: {e}")
-            return False
+        return self._update_row("reseller", "reseller_id", reseller_id, updated_data)
     
     def get_next_reseller_id(self) -> str:
         """Generate next sequential reseller ID"""
         try:
-            resellers_df = self.get_resellers()
-            if resellers_df.empty:
-                return "reseller_001"
-            
-            # Extract numeric part and find max
-            existing_ids = resellers_df['reseller_id'].str.extract(r'reseller_(\d+)')[0].astype(int)
-            next_num = existing_ids.max() + 1
-            
-            return f"reseller_{next_num:03d}"
+            return self._next_sequential_id("reseller", "reseller_id", "reseller")
         except Exception as e:
             logger.error(f"Error generating reseller ID: {e}")
-            return f"reseller_{len(resellers_df) + 1:03d}"
+            return f"reseller_{len(self.get_resellers()) + 1:03d}"
     
     def get_docs_by_agent(self, agent_id: str) -> pd.DataFrame:
         """Get documentation for specific agent"""
-        docs_df = self.get_docs()
-        return docs_df[docs_df['agent_id'] == agent_id]
+        return self._query("docs", {"agent_id": agent_id})
     
     def get_next_agent_id(self) -> str:
         """Generate next sequential agent ID"""
         try:
-            agents_df = self.get_agents()
-            if agents_df.empty:
-                return "agent_001"
-            
-            # Extract numeric part and find max
-            existing_ids = agents_df['agent_id'].str.extract(r'agent_(\d+)')[0].astype(int)
-            next_num = existing_ids.max() + 1
-            
-            return f"agent_{next_num:03d}"
+            return self._next_sequential_id("agents", "agent_id", "agent")
         except Exception as e:
             logger.error(f"Error generating agent ID: {e}")
-            return f"agent_{len(agents_df) + 1:03d}"
+            return f"agent_{len(self.get_agents()) + 1:03d}"
     
     def save_agent_data(self, agent_data: Dict) -> bool:
         """Save new agent data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("agents", agent_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("agents", agent_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving agent data: {e}")
-            return False
+        return self._save_row("agents", agent_data)
     
     def save_capabilities_mapping_data(self, capabilities_data: List[Dict]) -> bool:
         """Save capabilities mapping data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("capabilities_mapping", capabilities_data)
-            elif self.data_source == "postgres":
-                # For list data, save each item individually
-                for item in capabilities_data:
-                    if not self._save_postgres_data("capabilities_mapping", item):
-                        return False
-                logger.info(f"Saved {len(capabilities_data)} capability mappings")
-                return True
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving capabilities mapping data: {e}")
-            return False
+        return self._save_rows("capabilities_mapping", capabilities_data)
     
     def save_demo_assets_data(self, demo_assets_data: List[Dict]) -> bool:
         """Save demo assets data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("demo_assets", demo_assets_data)
-            elif self.data_source == "postgres":
-                # For list data, save each item individually
-                for item in demo_assets_data:
-                    if not self._save_postgres_data("demo_assets", item):
-                        return False
-                logger.info(f"Saved {len(demo_assets_data)} demo assets")
-                return True
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving demo assets data: {e}")
-            return False
+        return self._save_rows("demo_assets", demo_assets_data)
     
     def save_docs_data(self, docs_data: Dict) -> bool:
         """Save documentation data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("docs", docs_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("docs", docs_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving docs data: {e}")
-            return False
+        return self._save_row("docs", docs_data)
     
     def save_deployments_data(self, deployments_data: List[Dict]) -> bool:
         """Save deployments data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("deployments", deployments_data)
-            elif self.data_source == "postgres":
-                # For list data, save each item individually
-                for item in deployments_data:
-                    if not self._save_postgres_data("deployments", item):
-                        return False
-                logger.info(f"Saved {len(deployments_data)} deployments")
-                return True
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving deployments data: {e}")
-            return False
+        return self._save_rows("deployments", deployments_data)
     
     def update_agent_data(self, agent_id: str, updated_data: Dict) -> bool:
         """Update existing agent data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("agents", "agent_id", agent_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("agents", "agent_id", agent_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating agent data: {e}")
-            return False
+        return self._update_row("agents", "agent_id", agent_id, updated_data)
     
     def update_docs_data(self, agent_id: str, updated_data: Dict) -> bool:
         """Update existing docs data in CSV file or PostgreSQL. Creates record if it doesn't exist."""
         try:
-            if self.data_source == "csv":
-                return self._update_csv_data("docs", "agent_id", agent_id, updated_data)
-            elif self.data_source == "postgres":
-                # Check if docs record exists for this agent
-                docs_df = self.get_docs_by_agent(agent_id)
-                if docs_df.empty:
-                    # Create new record if it doesn't exist
-                    logger.info(f"Creating new docs record for agent {agent_id}")
-                    new_docs_data = {"agent_id": agent_id}
-                    new_docs_data.update(updated_data)
-                    return self._save_postgres_data("docs", new_docs_data)
-                else:
-                    # Update existing record
-                    return self._update_postgres_data("docs", "agent_id", agent_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            # In PostgreSQL, check if docs record exists for this agent and create it if it doesn't
+            if self.data_source == "postgres" and self.get_docs_by_agent(agent_id).empty:
+                logger.info(f"Creating new docs record for agent {agent_id}")
+                new_docs_data = {"agent_id": agent_id}
+                new_docs_data.update(updated_data)
+                return self._save_row("docs", new_docs_data)
+            
+            # Update existing record
+            return self._update_row("docs", "agent_id", agent_id, updated_data)
         except Exception as e:
             logger.error(f"Error updating docs data: {e}")
             return False
     
     def update_deployments_data(self, by_capability_id: str, updated_data: Dict) -> bool:
         """Update existing deployments data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("deployments", "by_capability_id", by_capability_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("deployments", "by_capability_id", by_capability_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating deployments data: {e}")
-            return False
+        return self._update_row("deployments", "by_capability_id", by_capability_id, updated_data)
     
     def update_demo_assets_data(self, demo_asset_id: str, updated_data: Dict) -> bool:
         """Update existing demo assets data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("demo_assets", "demo_asset_id", demo_asset_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("demo_assets", "demo_asset_id", demo_asset_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating demo assets data: {e}")
-            return False
+        return self._update_row("demo_assets", "demo_asset_id", demo_asset_id, updated_data)
     
     def get_chat_history(self) -> pd.DataFrame:
         """Load chat history data from CSV file or PostgreSQL"""
@@ -827,17 +1401,9 @@ class DataSource:
         """Save new chat history data to CSV file or PostgreSQL"""
         try:
             # Add timestamps
-            chat_data['created_at'] = datetime.now().isoformat()
-            chat_data['updated_at'] = datetime.now().isoformat()
-            chat_data['status'] = 'active'
+            _stamp(chat_data, 'created_at', 'updated_at', status='active')
             
-            if self.data_source == "csv":
-                return self._save_csv_data("chat_history", chat_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("chat_history", chat_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            return self._insert_row("chat_history", chat_data)
         except Exception as e:
             logger.error(f"Error saving chat history: {str(e)}")
             return False
@@ -845,75 +1411,45 @@ class DataSource:
     def update_chat_history_data(self, session_id: str, updated_data: Dict) -> bool:
         """Update existing chat history data in CSV file or PostgreSQL"""
         try:
-            updated_data['updated_at'] = datetime.now().isoformat()
+            _stamp(updated_data, 'updated_at')
             
-            if self.data_source == "csv":
-                return self._update_csv_data("chat_history", "session_id", session_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("chat_history", "session_id", session_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            return self._update_row("chat_history", "session_id", session_id, updated_data)
         except Exception as e:
             logger.error(f"Error updating chat history: {e}")
             return False
     
     def delete_chat_history_data(self, session_id: str) -> bool:
         """Delete chat history data from CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                chat_history_df = self.get_chat_history()
-                mask = chat_history_df['session_id'] == session_id
-                if not mask.any():
-                    logger.error(f"Chat history not found for session: {session_id}")
-                    return False
-                chat_history_df = chat_history_df[~mask]
-                csv_path = self.csv_paths["chat_history"]
-                chat_history_df.to_csv(csv_path, index=False)
-                logger.info(f"Deleted chat history for session: {session_id}")
-                return True
-            elif self.data_source == "postgres":
-                return self._delete_postgres_data("chat_history", "session_id", session_id)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error deleting chat history: {e}")
-            return False
+        return self._delete_rows("chat_history", "session_id", session_id)
     
     def get_enquiries(self) -> pd.DataFrame:
         """Get all enquiries"""
         return self.get_table_data("enquiries")
     
+    def get_next_enquiry_id(self) -> str:
+        """Generate next sequential enquiry ID"""
+        if self.data_source == "postgres":
+            return self._next_sequence_id("enquiries")
+        return self._next_sequential_id("enquiries", "enquiry_id", "enquiry")
+    
     def save_enquiries_data(self, enquiry_data: Dict) -> bool:
         """Save new enquiry data to CSV file or PostgreSQL"""
         try:
-            # Generate enquiry ID
-            enquiries_df = self.get_enquiries()
-            if enquiries_df.empty:
-                enquiry_id = "enquiry_001"
-            else:
-                max_id = int(enquiries_df['enquiry_id'].str.replace('enquiry_', '').astype(int).max())
-                enquiry_id = f"enquiry_{max_id + 1:03d}"
-            
             # Add required fields
-            enquiry_data['enquiry_id'] = enquiry_id
-            enquiry_data['created_at'] = datetime.now().isoformat()
-            enquiry_data['status'] = 'new'
+            enquiry_data['enquiry_id'] = self.get_next_enquiry_id()
+            _stamp(enquiry_data, 'created_at', status='new')
             
-            if self.data_source == "csv":
-                return self._save_csv_data("enquiries", enquiry_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("enquiries", enquiry_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            return self._insert_row("enquiries", enquiry_data)
         except Exception as e:
             logger.error(f"Error saving enquiry: {str(e)}")
             return False
     
     def health_check(self) -> Dict:
-        """Check health of data source"""
+        """Check health of data source (a healthy result is reused for one second)"""
+        cached = self._health_cache
+        if cached is not None and time.monotonic() - cached[0] < 1.0:
+            return cached[1]
+        
         try:
             if self.data_source == "csv":
                 # Check if CSV files exist
@@ -930,13 +1466,15 @@ class DataSource:
             
             elif self.data_source == "postgres":
                 # Test database connection using pool
-                conn = self._get_connection()
-                self._return_connection(conn)
+                with self._conn():
+                    pass
                 
-                return {
+                result = {
                     "status": "healthy",
                     "data_source": self.data_source
                 }
+                self._health_cache = (time.monotonic(), result)
+                return result
                 
         except Exception as e:
             return {
@@ -960,36 +1498,18 @@ class DataSource:
     
     def get_next_requirement_id(self) -> str:
         """Generate next sequential requirement ID"""
-        try:
-            requirements_df = self.get_agent_requirements()
-            if requirements_df.empty:
-                return "req_001"
-            
-            # Extract numeric part and find max
-            existing_ids = requirements_df['requirement_id'].str.extract(r'req_(\d+)')[0].astype(int)
-            next_num = existing_ids.max() + 1
-            
-            return f"req_{next_num:03d}"
-        except Exception as e:
-            logger.error(f"Error generating requirement ID: {e}")
-            return f"req_{len(requirements_df) + 1:03d}"
+        if self.data_source == "postgres":
+            return self._next_sequence_id("agent_requirements")
+        return self._next_sequential_id("agent_requirements", "requirement_id", "req")
     
     def save_agent_requirements_data(self, requirements_data: Dict) -> bool:
         """Save new agent requirements data to CSV file or PostgreSQL"""
         try:
             # Add requirement ID and timestamps
             requirements_data['requirement_id'] = self.get_next_requirement_id()
-            requirements_data['created_at'] = datetime.now().isoformat()
-            requirements_data['updated_at'] = datetime.now().isoformat()
-            requirements_data['status'] = 'discovered'
+            _stamp(requirements_data, 'created_at', 'updated_at', status='discovered')
             
-            if self.data_source == "csv":
-                return self._save_csv_data("agent_requirements", requirements_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("agent_requirements", requirements_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            return self._insert_row("agent_requirements", requirements_data)
         except Exception as e:
             logger.error(f"Error saving agent requirements: {str(e)}")
             return False
@@ -997,15 +1517,9 @@ class DataSource:
     def update_agent_requirements_data(self, requirement_id: str, updated_data: Dict) -> bool:
         """Update existing agent requirements data in CSV file or PostgreSQL"""
         try:
-            updated_data['updated_at'] = datetime.now().isoformat()
+            _stamp(updated_data, 'updated_at')
             
-            if self.data_source == "csv":
-                return self._update_csv_data("agent_requirements", "requirement_id", requirement_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("agent_requirements", "requirement_id", requirement_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
+            return self._update_row("agent_requirements", "requirement_id", requirement_id, updated_data)
         except Exception as e:
             logger.error(f"Error updating agent requirements: {str(e)}")
             return False
@@ -1018,56 +1532,18 @@ class DataSource:
     def get_next_client_id(self) -> str:
         """Generate next sequential client ID"""
         try:
-            clients_df = self.get_clients()
-            if clients_df.empty:
-                return "client_001"
-            
-            # Extract numeric part from client IDs
-            client_ids = clients_df['client_id'].tolist()
-            max_num = 0
-            
-            for client_id in client_ids:
-                if client_id.startswith('client_'):
-                    try:
-                        num = int(client_id.split('_')[1])
-                        max_num = max(max_num, num)
-                    except (ValueError, IndexError):
-                        continue
-            
-            next_num = max_num + 1
-            return f"client_{next_num:03d}"
-            
+            return self._next_sequential_id("client", "client_id", "client")
         except Exception as e:
             logger.error(f"Error generating next client ID: {str(e)}")
             return "client_001"
     
     def save_client_data(self, client_data: Dict) -> bool:
         """Save new client data to CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._save_csv_data("client", client_data)
-            elif self.data_source == "postgres":
-                return self._save_postgres_data("client", client_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error saving client data: {str(e)}")
-            return False
+        return self._save_row("client", client_data)
     
     def update_client_data(self, client_id: str, updated_data: Dict) -> bool:
         """Update existing client data in CSV file or PostgreSQL"""
-        try:
-            if self.data_source == "csv":
-                return self._update_csv_data("client", "client_id", client_id, updated_data)
-            elif self.data_source == "postgres":
-                return self._update_postgres_data("client", "client_id", client_id, updated_data)
-            else:
-                logger.error(f"Unknown data source: {self.data_source}")
-                return False
-        except Exception as e:
-            logger.error(f"Error updating client data: {str(e)}")
-            return False
+        return self._update_row("client", "client_id", client_id, updated_data)
 
-# Global data source instance
+# Global data source instance (import this rather than creating DataSource objects)
 data_source = DataSource()
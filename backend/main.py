@@ -3,21 +3,25 @@ FastAPI application for Agents Marketplace
 """
 from fastapi import FastAPI, HTTPException, Request, Form, File, UploadFile
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import pandas as pd
+import orjson
 import uuid
+import asyncio
 import logging
+import os
 from datetime import datetime
 from s3_utils import s3_manager
 
 # Configure logging
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 from data_source import data_source
 from config import API_CONFIG
-from unified_chat import unified_chat_agent
+from unified_chat import get_unified_chat_agent
 
 # Request models for API documentation
 class ChatRequest(BaseModel):
@@ -75,6 +79,36 @@ class ContactRequest(BaseModel):
         }
 
 
+async def _update_failed(get_by_id: Callable[[str], Optional[Dict]], row_id: str, not_found: str, failed: str) -> HTTPException:
+    """Error for an update_* call that returned False: 404 if the row doesn't exist, otherwise the write itself failed"""
+    # Looked up in a worker thread, like the write before it
+    row = await asyncio.to_thread(get_by_id, row_id)
+    if not row:
+        return HTTPException(status_code=404, detail=not_found)
+    return HTTPException(status_code=500, detail=failed)
+
+
+def _records_with_na(df: pd.DataFrame) -> List[Dict]:
+    """Convert a DataFrame to response records, with missing values replaced by "na" in one vectorized pass"""
+    if df.empty:
+        return []
+    return df.astype(object).where(df.notna(), "na").to_dict('records')
+
+
+_frontend_pages: Dict[str, tuple] = {}  # file name -> (st_mtime_ns, HTML text)
+
+def _frontend_page(filename: str) -> str:
+    """Get the contents of a frontend HTML file, read from disk again only when the file has changed"""
+    path = f"../frontend/{filename}"
+    mtime = os.stat(path).st_mtime_ns  # Raises FileNotFoundError for a missing page, like open() did
+    cached = _frontend_pages.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = (mtime, f.read())
+        _frontend_pages[filename] = cached
+    return cached[1]
+
+
 # Create FastAPI app
 app = FastAPI(
     title=API_CONFIG["title"],
@@ -215,7 +249,7 @@ async def signup(
             }
             
             # Save ISV data
-            data_saved = data_source.save_isv_data(isv_data)
+            data_saved = await asyncio.to_thread(data_source.save_isv_data, isv_data)
             redirect_url = "/isv/login"
             
         elif role == "reseller":
@@ -238,7 +272,7 @@ async def signup(
             }
             
             # Save reseller data
-            data_saved = data_source.save_reseller_data(reseller_data)
+            data_saved = await asyncio.to_thread(data_source.save_reseller_data, reseller_data)
             redirect_url = "/reseller/login"
         
         elif role == "client":
@@ -255,7 +289,7 @@ async def signup(
             }
             
             # Save client data
-            data_saved = data_source.save_client_data(client_data)
+            data_saved = await asyncio.to_thread(data_source.save_client_data, client_data)
             redirect_url = "/client/login"
         
         # Create auth record
@@ -270,7 +304,7 @@ async def signup(
         }
         
         # Save auth data
-        auth_saved = data_source.save_auth_data(auth_data)
+        auth_saved = await asyncio.to_thread(data_source.save_auth_data, auth_data)
         
         if not (data_saved and auth_saved):
             raise HTTPException(status_code=500, detail="Failed to save registration data")
@@ -325,7 +359,7 @@ async def update_client_profile(
             "client_email_no": client_email_no
         }
         
-        success = data_source.update_client_data(client_id, updated_data)
+        success = await asyncio.to_thread(data_source.update_client_data, client_id, updated_data)
         
         if not success:
             raise HTTPException(status_code=404, detail="Client not found")
@@ -371,13 +405,7 @@ async def get_isv_profile(isv_id: str):
         
         # Get agents for this ISV
         agents_df = data_source.get_agents_by_isv(isv_id)
-        agents = agents_df.to_dict('records') if not agents_df.empty else []
-        
-        # Replace NaN values in agents
-        for agent in agents:
-            for key, value in agent.items():
-                if pd.isna(value):
-                    agent[key] = "na"
+        agents = _records_with_na(agents_df)
         
         # Calculate statistics
         stats = {
@@ -471,16 +499,18 @@ async def update_isv_profile(
             }
         
         # Update the CSV file
-        success = data_source.update_isv_data(isv_id, update_data)
+        success = await asyncio.to_thread(data_source.update_isv_data, isv_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update profile")
+            raise await _update_failed(data_source.get_isv_by_id, isv_id, "ISV not found", "Failed to update profile")
         
         return {
             "success": True,
             "message": "Profile updated successfully",
             "isv_id": isv_id
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating profile: {str(e)}")
 
@@ -493,13 +523,7 @@ async def get_all_isvs():
     """Admin: Get all ISVs with statistics"""
     try:
         isvs_df = data_source.get_isvs()
-        isvs = isvs_df.to_dict('records')
-        
-        # Replace NaN values
-        for isv in isvs:
-            for key, value in isv.items():
-                if pd.isna(value):
-                    isv[key] = "na"
+        isvs = _records_with_na(isvs_df)
         
         # Add statistics for each ISV
         for isv in isvs:
@@ -535,10 +559,10 @@ async def admin_update_isv(
         }
         
         # Update the CSV file
-        success = data_source.update_isv_data(isv_id, update_data)
+        success = await asyncio.to_thread(data_source.update_isv_data, isv_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update ISV")
+            raise await _update_failed(data_source.get_isv_by_id, isv_id, "ISV not found", "Failed to update ISV")
         
         return {
             "success": True,
@@ -546,6 +570,8 @@ async def admin_update_isv(
             "isv_id": isv_id,
             "admin_approved": admin_approved
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating ISV: {str(e)}")
 
@@ -607,16 +633,18 @@ async def update_reseller_profile(
         }
         
         # Update the CSV file
-        success = data_source.update_reseller_data(reseller_id, update_data)
+        success = await asyncio.to_thread(data_source.update_reseller_data, reseller_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update profile")
+            raise await _update_failed(data_source.get_reseller_by_id, reseller_id, "Reseller not found", "Failed to update profile")
         
         return {
             "success": True,
             "message": "Profile updated successfully",
             "reseller_id": reseller_id
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating profile: {str(e)}")
 
@@ -629,13 +657,7 @@ async def get_all_resellers():
     """Admin: Get all resellers"""
     try:
         resellers_df = data_source.get_resellers()
-        resellers = resellers_df.to_dict('records')
-        
-        # Replace NaN values
-        for reseller in resellers:
-            for key, value in reseller.items():
-                if pd.isna(value):
-                    reseller[key] = "na"
+        resellers = _records_with_na(resellers_df)
         
         return {"resellers": resellers, "total": len(resellers)}
         
@@ -667,10 +689,10 @@ async def admin_update_reseller(
         }
         
         # Update the CSV file
-        success = data_source.update_reseller_data(reseller_id, update_data)
+        success = await asyncio.to_thread(data_source.update_reseller_data, reseller_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update reseller")
+            raise await _update_failed(data_source.get_reseller_by_id, reseller_id, "Reseller not found", "Failed to update reseller")
         
         return {
             "success": True,
@@ -678,6 +700,8 @@ async def admin_update_reseller(
             "reseller_id": reseller_id,
             "admin_approved": admin_approved
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating reseller: {str(e)}")
 
@@ -747,7 +771,7 @@ async def onboard_agent(
         }
         
         # Save agent data
-        agent_saved = data_source.save_agent_data(agent_data)
+        agent_saved = await asyncio.to_thread(data_source.save_agent_data, agent_data)
         
         if not agent_saved:
             raise HTTPException(status_code=500, detail="Failed to save agent data")
@@ -776,7 +800,7 @@ async def onboard_agent(
                 })
         
         if capabilities_data:
-            data_source.save_capabilities_mapping_data(capabilities_data)
+            await asyncio.to_thread(data_source.save_capabilities_mapping_data, capabilities_data)
         
         # Process demo assets: handle both single links and bulk file uploads
         demo_assets_data = []
@@ -869,7 +893,7 @@ async def onboard_agent(
         
         # Save all demo assets
         if demo_assets_data:
-            data_source.save_demo_assets_data(demo_assets_data)
+            await asyncio.to_thread(data_source.save_demo_assets_data, demo_assets_data)
             logger.info(f"Saved {len(demo_assets_data)} demo assets for agent {agent_id}")
         
         # Handle README file upload
@@ -916,7 +940,7 @@ async def onboard_agent(
             "related_files": related_files_combined
         }
         
-        data_source.save_docs_data(docs_data)
+        await asyncio.to_thread(data_source.save_docs_data, docs_data)
         
         # Process deployments
         if deployments:
@@ -966,7 +990,7 @@ async def onboard_agent(
                     })
                 
                 if deployments_data:
-                    data_source.save_deployments_data(deployments_data)
+                    await asyncio.to_thread(data_source.save_deployments_data, deployments_data)
                     logger.info(f"Saved {len(deployments_data)} deployments for agent {agent_id}")
                 else:
                     logger.warning(f"No valid deployments to save for agent {agent_id}")
@@ -995,14 +1019,9 @@ async def get_all_agents_admin():
     """Admin: Get all agents with approval status"""
     try:
         agents_df = data_source.get_agents()
-        agents_list = agents_df.to_dict('records')
+        agents_list = _records_with_na(agents_df)
         
-        # Replace NaN values and add approval status
         for agent in agents_list:
-            for key, value in agent.items():
-                if pd.isna(value):
-                    agent[key] = "na"
-            
             # Add approval status
             agent['is_approved'] = agent.get('admin_approved', 'no') == 'yes'
         
@@ -1033,10 +1052,10 @@ async def admin_update_agent_approval(
             "admin_approved": admin_approved
         }
         
-        success = data_source.update_agent_data(agent_id, update_data)
+        success = await asyncio.to_thread(data_source.update_agent_data, agent_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update agent approval status")
+            raise await _update_failed(data_source.get_agent_by_id, agent_id, f"Agent {agent_id} not found", "Failed to update agent approval status")
         
         return {
             "success": True,
@@ -1044,6 +1063,8 @@ async def admin_update_agent_approval(
             "agent_id": agent_id,
             "admin_approved": admin_approved
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating agent approval: {str(e)}")
 
@@ -1119,10 +1140,10 @@ async def edit_agent(
             raise HTTPException(status_code=400, detail="No fields provided for update")
         
         # Update the agent data
-        success = data_source.update_agent_data(agent_id, update_data)
+        success = await asyncio.to_thread(data_source.update_agent_data, agent_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update agent")
+            raise await _update_failed(data_source.get_agent_by_id, agent_id, f"Agent {agent_id} not found", "Failed to update agent")
         
         # Handle documentation updates
         docs_updated = False
@@ -1171,7 +1192,7 @@ async def edit_agent(
                 logger.error(f"Error uploading README file {readme_file.filename} for agent {agent_id}: {str(e)}")
         
         if docs_data:
-            docs_success = data_source.update_docs_data(agent_id, docs_data)
+            docs_success = await asyncio.to_thread(data_source.update_docs_data, agent_id, docs_data)
             if docs_success:
                 docs_updated = True
         
@@ -1191,7 +1212,7 @@ async def edit_agent(
                         first_capability_id = agent_capabilities.iloc[0]['by_capability_id']
                         first_deployment = deployments_list[0]
                         
-                        deployment_success = data_source.update_deployments_data(first_capability_id, first_deployment)
+                        deployment_success = await asyncio.to_thread(data_source.update_deployments_data, first_capability_id, first_deployment)
                         if deployment_success:
                             deployments_updated = True
             except (json.JSONDecodeError, KeyError, IndexError) as e:
@@ -1212,7 +1233,7 @@ async def edit_agent(
                             demo_asset_id = asset_data['demo_asset_id']
                             update_data = {k: v for k, v in asset_data.items() if k != 'demo_asset_id'}
                             if update_data:
-                                success = data_source.update_demo_assets_data(demo_asset_id, update_data)
+                                success = await asyncio.to_thread(data_source.update_demo_assets_data, demo_asset_id, update_data)
                                 if success:
                                     demo_assets_updated = True
             except (json.JSONDecodeError, KeyError, IndexError) as e:
@@ -1228,6 +1249,7 @@ async def edit_agent(
                 existing_demo_assets_df = data_source.get_demo_assets()
                 agent_demo_assets = existing_demo_assets_df[existing_demo_assets_df['agent_id'] == agent_id]
                 file_counter = len(agent_demo_assets) + 1
+                new_demo_assets = []  # Saved together once all files are uploaded
                 
                 for file in demo_files:
                     if file.filename:
@@ -1252,12 +1274,14 @@ async def edit_agent(
                                     "asset_file_path": s3_url
                                 }
                                 
-                                data_source.save_demo_assets_data([demo_asset_data])
-                                demo_assets_updated = True
+                                new_demo_assets.append(demo_asset_data)
                                 file_counter += 1
                                 
                         except Exception as e:
                             logger.error(f"Error uploading demo file {file.filename}: {str(e)}")
+                
+                if new_demo_assets:
+                    demo_assets_updated = await asyncio.to_thread(data_source.save_demo_assets_data, new_demo_assets)
                             
             except Exception as e:
                 logger.error(f"Error processing demo files: {str(e)}")
@@ -1282,6 +1306,7 @@ async def edit_agent(
                     existing_demo_assets_df = data_source.get_demo_assets()
                     agent_demo_assets = existing_demo_assets_df[existing_demo_assets_df['agent_id'] == agent_id]
                     file_counter = len(agent_demo_assets) + 1
+                    new_demo_assets = []  # Saved together in one write
                     
                     for link in demo_links_list:
                         if link and link.strip():
@@ -1294,11 +1319,13 @@ async def edit_agent(
                                 "asset_url": link.strip()
                             }
                             
-                            success = data_source.save_demo_assets_data([demo_asset_data])
-                            if success:
-                                demo_links_updated = True
-                                file_counter += 1
-                                logger.info(f"Added demo link for agent {agent_id}: {link}")
+                            new_demo_assets.append(demo_asset_data)
+                            file_counter += 1
+                    
+                    if new_demo_assets and await asyncio.to_thread(data_source.save_demo_assets_data, new_demo_assets):
+                        demo_links_updated = True
+                        for demo_asset in new_demo_assets:
+                            logger.info(f"Added demo link for agent {agent_id}: {demo_asset['asset_url']}")
             except json.JSONDecodeError:
                 pass  # Skip if invalid JSON
         
@@ -1392,10 +1419,10 @@ async def admin_edit_agent(
             raise HTTPException(status_code=400, detail="No fields provided for update")
         
         # Update the agent data
-        success = data_source.update_agent_data(agent_id, update_data)
+        success = await asyncio.to_thread(data_source.update_agent_data, agent_id, update_data)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to update agent")
+            raise await _update_failed(data_source.get_agent_by_id, agent_id, f"Agent {agent_id} not found", "Failed to update agent")
         
         # Handle documentation updates
         docs_updated = False
@@ -1444,7 +1471,7 @@ async def admin_edit_agent(
                 logger.error(f"Error uploading README file {readme_file.filename} for agent {agent_id}: {str(e)}")
         
         if docs_data:
-            docs_success = data_source.update_docs_data(agent_id, docs_data)
+            docs_success = await asyncio.to_thread(data_source.update_docs_data, agent_id, docs_data)
             if docs_success:
                 docs_updated = True
         
@@ -1464,7 +1491,7 @@ async def admin_edit_agent(
                         first_capability_id = agent_capabilities.iloc[0]['by_capability_id']
                         first_deployment = deployments_list[0]
                         
-                        deployment_success = data_source.update_deployments_data(first_capability_id, first_deployment)
+                        deployment_success = await asyncio.to_thread(data_source.update_deployments_data, first_capability_id, first_deployment)
                         if deployment_success:
                             deployments_updated = True
             except (json.JSONDecodeError, KeyError, IndexError) as e:
@@ -1485,7 +1512,7 @@ async def admin_edit_agent(
                             demo_asset_id = asset_data['demo_asset_id']
                             update_data = {k: v for k, v in asset_data.items() if k != 'demo_asset_id'}
                             if update_data:
-                                success = data_source.update_demo_assets_data(demo_asset_id, update_data)
+                                success = await asyncio.to_thread(data_source.update_demo_assets_data, demo_asset_id, update_data)
                                 if success:
                                     demo_assets_updated = True
             except (json.JSONDecodeError, KeyError, IndexError) as e:
@@ -1501,6 +1528,7 @@ async def admin_edit_agent(
                 existing_demo_assets_df = data_source.get_demo_assets()
                 agent_demo_assets = existing_demo_assets_df[existing_demo_assets_df['agent_id'] == agent_id]
                 file_counter = len(agent_demo_assets) + 1
+                new_demo_assets = []  # Saved together once all files are uploaded
                 
                 for file in demo_files:
                     if file.filename:
@@ -1525,12 +1553,14 @@ async def admin_edit_agent(
                                     "asset_file_path": s3_url
                                 }
                                 
-                                data_source.save_demo_assets_data([demo_asset_data])
-                                demo_assets_updated = True
+                                new_demo_assets.append(demo_asset_data)
                                 file_counter += 1
                                 
                         except Exception as e:
                             logger.error(f"Error uploading demo file {file.filename}: {str(e)}")
+                
+                if new_demo_assets:
+                    demo_assets_updated = await asyncio.to_thread(data_source.save_demo_assets_data, new_demo_assets)
                             
             except Exception as e:
                 logger.error(f"Error processing demo files: {str(e)}")
@@ -1555,6 +1585,7 @@ async def admin_edit_agent(
                     existing_demo_assets_df = data_source.get_demo_assets()
                     agent_demo_assets = existing_demo_assets_df[existing_demo_assets_df['agent_id'] == agent_id]
                     file_counter = len(agent_demo_assets) + 1
+                    new_demo_assets = []  # Saved together in one write
                     
                     for link in demo_links_list:
                         if link and link.strip():
@@ -1567,11 +1598,13 @@ async def admin_edit_agent(
                                 "asset_url": link.strip()
                             }
                             
-                            success = data_source.save_demo_assets_data([demo_asset_data])
-                            if success:
-                                demo_links_updated = True
-                                file_counter += 1
-                                logger.info(f"Added demo link for agent {agent_id}: {link}")
+                            new_demo_assets.append(demo_asset_data)
+                            file_counter += 1
+                    
+                    if new_demo_assets and await asyncio.to_thread(data_source.save_demo_assets_data, new_demo_assets):
+                        demo_links_updated = True
+                        for demo_asset in new_demo_assets:
+                            logger.info(f"Added demo link for agent {agent_id}: {demo_asset['asset_url']}")
             except json.JSONDecodeError:
                 pass  # Skip if invalid JSON
         
@@ -1730,17 +1763,12 @@ async def get_all_agents():
                             if service_provider:
                                 agent_service_providers[agent_id].add(service_provider)
         
-        agents_list = agents_df.to_dict('records')
+        agents_list = _records_with_na(agents_df)
         
         # Add by_capability, service_provider, and demo_preview fields to each agent
         for agent in agents_list:
             agent_id = agent.get('agent_id', '')
             
-            # Replace NaN values with "na" and remove demo_preview from original data
-            for key, value in agent.items():
-                if pd.isna(value):
-                    agent[key] = "na"
-            
             # Remove the original demo_preview field from agents table
             if 'demo_preview' in agent:
                 del agent['demo_preview']
@@ -1800,6 +1828,8 @@ async def get_agent_details(agent_id: str):
         agent_service_providers = set()
         agent_demo_previews = set()
         
+        capability_names = {}  # by_capability_id -> capability name, for labelling deployments
+        
         if capabilities:
             for cap in capabilities:
                 capability_name = cap.get('by_capability', '')
@@ -1808,14 +1838,27 @@ async def get_agent_details(agent_id: str):
                 if capability_name:
                     agent_capabilities.add(capability_name)
                 
-                # Get service providers for this capability
-                if capability_id:
-                    deployments = data_source.get_deployments_by_capability(capability_id)
-                    if not deployments.empty:
-                        for _, deployment in deployments.iterrows():
-                            service_provider = deployment.get('service_provider', '')
-                            if service_provider:
-                                agent_service_providers.add(service_provider)
+                if capability_id and not pd.isna(capability_id):
+                    capability_names.setdefault(capability_id, cap.get('by_capability', 'na'))
+        
+        # Get all deployments for this agent's capabilities with one filter over the deployments table
+        deployments_df = data_source.get_deployments()
+        if capability_names and 'by_capability_id' in deployments_df.columns:
+            agent_deployments_df = deployments_df[deployments_df['by_capability_id'].isin(list(capability_names))]
+            agent_deployments_df = agent_deployments_df.assign(
+                capability_name=agent_deployments_df['by_capability_id'].map(capability_names)
+            )
+            # Group deployments in the agent's capability order (table order within a capability), as per-capability lookups did
+            capability_order = pd.Categorical(agent_deployments_df['by_capability_id'], categories=list(capability_names))
+            agent_deployments_df = agent_deployments_df.iloc[capability_order.codes.argsort(kind="stable")]
+        else:
+            agent_deployments_df = deployments_df.iloc[0:0]
+        
+        # Get service providers for these capabilities
+        if 'service_provider' in agent_deployments_df.columns:
+            agent_service_providers.update(
+                service_provider for service_provider in agent_deployments_df['service_provider'].dropna() if service_provider
+            )
         
         
         # Remove the original demo_preview field from agents table
@@ -1826,33 +1869,11 @@ async def get_agent_details(agent_id: str):
         agent['by_capability'] = ', '.join(sorted(agent_capabilities)) if agent_capabilities else "na"
         agent['service_provider'] = ', '.join(sorted(agent_service_providers)) if agent_service_providers else "na"
         
-        # Get all deployments for this agent's capabilities
-        all_deployments = []
-        for cap in capabilities:
-            cap_id = cap.get('by_capability_id')
-            if cap_id:
-                deployments = data_source.get_deployments_by_capability(cap_id)
-                deployments_list = deployments.to_dict('records') if not deployments.empty else []
-                # Add capability info to each deployment
-                for dep in deployments_list:
-                    dep['capability_name'] = cap.get('by_capability', 'na')
-                all_deployments.extend(deployments_list)
-        
-        # Replace NaN values in deployments
-        for dep in all_deployments:
-            for key, value in dep.items():
-                if pd.isna(value):
-                    dep[key] = "na"
+        all_deployments = _records_with_na(agent_deployments_df)
         
         # Get demo assets
         demo_assets_df = data_source.get_demo_assets_by_agent(agent_id)
-        demo_assets = demo_assets_df.to_dict('records') if not demo_assets_df.empty else []
-        
-        # Replace NaN values in demo assets
-        for asset in demo_assets:
-            for key, value in asset.items():
-                if pd.isna(value):
-                    asset[key] = "na"
+        demo_assets = _records_with_na(demo_assets_df)
         
         # Get demo previews from demo_assets for this agent
         if demo_assets:
@@ -1870,29 +1891,27 @@ async def get_agent_details(agent_id: str):
         
         # Get documentation for this specific agent
         docs_df = data_source.get_docs_by_agent(agent_id)
-        docs = docs_df.to_dict('records') if not docs_df.empty else []
+        docs = _records_with_na(docs_df)
         
-        # Replace NaN values in docs and generate signed URLs for S3 links
+        # Generate signed URLs for S3 links
         for doc in docs:
-            for key, value in doc.items():
-                if pd.isna(value):
-                    doc[key] = "na"
-                elif key == 'related_files' and value and value != 'na':
-                    # Check if related_files contains S3 URLs and generate signed URLs
-                    related_files_list = [f.strip() for f in str(value).split(',') if f.strip()]
-                    signed_files = []
-                    for file_url in related_files_list:
-                        if 's3.amazonaws.com' in file_url:
-                            try:
-                                signed_url = s3_manager.generate_signed_url(file_url)
-                                signed_files.append(signed_url)
-                                logger.info(f"Generated signed URL for README file: {file_url}")
-                            except Exception as e:
-                                logger.error(f"Error generating signed URL for README file {file_url}: {str(e)}")
-                                signed_files.append(file_url)  # Fallback to original URL
-                        else:
-                            signed_files.append(file_url)  # Keep non-S3 URLs as-is
-                    doc[key] = ', '.join(signed_files)
+            value = doc.get('related_files')
+            if value and value != 'na':
+                # Check if related_files contains S3 URLs and generate signed URLs
+                related_files_list = [f.strip() for f in str(value).split(',') if f.strip()]
+                signed_files = []
+                for file_url in related_files_list:
+                    if 's3.amazonaws.com' in file_url:
+                        try:
+                            signed_url = s3_manager.generate_signed_url(file_url)
+                            signed_files.append(signed_url)
+                            logger.info(f"Generated signed URL for README file: {file_url}")
+                        except Exception as e:
+                            logger.error(f"Error generating signed URL for README file {file_url}: {str(e)}")
+                            signed_files.append(file_url)  # Fallback to original URL
+                    else:
+                        signed_files.append(file_url)  # Keep non-S3 URLs as-is
+                doc['related_files'] = ', '.join(signed_files)
         
         # Get ISV info
         isv_id = agent.get('isv_id', 'na')
@@ -1952,7 +1971,7 @@ async def get_all_capabilities():
         # Get capabilities from capabilities_mapping
         mapping_df = data_source.get_capabilities_mapping()
         capabilities = mapping_df[['by_capability_id', 'by_capability']].drop_duplicates()
-        capabilities_list = capabilities.to_dict('records')
+        capabilities_list = _records_with_na(capabilities)
         
         # Get deployments data for grouping
         deployments_df = data_source.get_deployments()
@@ -2024,12 +2043,6 @@ async def get_all_capabilities():
         # Sort by service_provider and by_capability
         grouped_list.sort(key=lambda x: (x["service_provider"], x["by_capability"]))
         
-        # Replace NaN values in capabilities
-        for cap in capabilities_list:
-            for key, value in cap.items():
-                if pd.isna(value):
-                    cap[key] = "na"
-        
         return {
             "capabilities": capabilities_list,
             "grouped_deployments": grouped_list
@@ -2098,8 +2111,7 @@ async def get_unique_values():
 async def navigation_dashboard():
     """Serve the navigation dashboard"""
     try:
-        with open("../frontend/navigation_dashboard.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("navigation_dashboard.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Navigation dashboard not found")
@@ -2110,8 +2122,7 @@ async def navigation_dashboard():
 async def navigation_dashboard_alt():
     """Serve the navigation dashboard (alternative route)"""
     try:
-        with open("../frontend/navigation_dashboard.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("navigation_dashboard.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Navigation dashboard not found")
@@ -2122,8 +2133,7 @@ async def navigation_dashboard_alt():
 async def unified_chat_page():
     """Serve the unified chat page"""
     try:
-        with open("../frontend/unified_chat.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("unified_chat.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Unified chat page not found")
@@ -2134,8 +2144,7 @@ async def unified_chat_page():
 async def agent_onboard_page_direct():
     """Serve the agent onboarding page (direct access)"""
     try:
-        with open("../frontend/agent_onboard.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("agent_onboard.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Agent onboard page not found")
@@ -2146,8 +2155,7 @@ async def agent_onboard_page_direct():
 async def admin_login_page():
     """Serve the admin login page"""
     try:
-        with open("../frontend/admin_login.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_login.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin login page not found")
@@ -2158,8 +2166,7 @@ async def admin_login_page():
 async def admin_dashboard_page():
     """Serve the admin dashboard page"""
     try:
-        with open("../frontend/admin_dashboard.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_dashboard.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin dashboard page not found")
@@ -2170,8 +2177,7 @@ async def admin_dashboard_page():
 async def admin_users_page():
     """Serve the admin users management page"""
     try:
-        with open("../frontend/admin_users.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_users.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin users page not found")
@@ -2182,8 +2188,7 @@ async def admin_users_page():
 async def test_agent_creation_page():
     """Serve the agent creation test page"""
     try:
-        with open("../frontend/test_agent_creation.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("test_agent_creation.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Agent creation test page not found")
@@ -2194,8 +2199,7 @@ async def test_agent_creation_page():
 async def test_demo_assets_page():
     """Serve the demo assets test page"""
     try:
-        with open("../frontend/test_demo_assets.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("test_demo_assets.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Demo assets test page not found")
@@ -2206,8 +2210,7 @@ async def test_demo_assets_page():
 async def test_chat_history_page():
     """Serve the chat history test page"""
     try:
-        with open("../frontend/test_chat_history.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("test_chat_history.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Chat history test page not found")
@@ -2218,8 +2221,7 @@ async def test_chat_history_page():
 async def agent_edit_page(agent_id: str):
     """Serve the agent edit page"""
     try:
-        with open("../frontend/agent_edit.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("agent_edit.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Agent edit page not found")
@@ -2230,8 +2232,7 @@ async def agent_edit_page(agent_id: str):
 async def admin_agent_edit_page(agent_id: str):
     """Serve the admin agent edit page"""
     try:
-        with open("../frontend/admin_agent_edit.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_agent_edit.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin agent edit page not found")
@@ -2421,8 +2422,7 @@ async def contact_page():
 async def agents_listing():
     """Serve the agents listing page"""
     try:
-        with open("../frontend/index.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("index.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Agents listing page not found")
@@ -2433,9 +2433,8 @@ async def agents_listing():
 async def agent_page(agent_name: str):
     """Serve the agent page HTML"""
     try:
-        # Read the HTML file
-        with open("../frontend/agent.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        # Get the HTML template (cached until the file changes)
+        html_content = _frontend_page("agent.html")
         
         # Replace placeholder with actual agent name
         html_content = html_content.replace("{{agent_name}}", agent_name)
@@ -2465,7 +2464,7 @@ async def unified_chat(chat_request: ChatRequest):
             raise HTTPException(status_code=400, detail="Query is required")
         
         # Use unified chat agent with user information
-        response = unified_chat_agent.chat(user_query, mode, session_id, user_id, user_type)
+        response = await get_unified_chat_agent().achat(user_query, mode, session_id, user_id, user_type)
         
         return {
             "success": True,
@@ -2477,6 +2476,30 @@ async def unified_chat(chat_request: ChatRequest):
         logger.error(f"Unified chat API error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def unified_chat_stream(chat_request: ChatRequest):
+    """Unified chat endpoint that streams the reply as server-sent events"""
+    user_query = chat_request.query.strip()
+    if not user_query:
+        raise HTTPException(status_code=400, detail="Query is required")
+    
+    async def event_stream():
+        # "delta" events carry reply text as it is generated, the final "done" event carries the chat result
+        async for event in get_unified_chat_agent().achat_stream(
+            user_query,
+            chat_request.mode,
+            chat_request.session_id or "",
+            chat_request.user_id or "anonymous",
+            chat_request.user_type or "anonymous"
+        ):
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/chat/clear")
 async def clear_chat_session(clear_request: ClearChatRequest):
     """Clear conversation history for a session"""
@@ -2488,7 +2511,7 @@ async def clear_chat_session(clear_request: ClearChatRequest):
             raise HTTPException(status_code=400, detail="Session ID is required")
         
         # Clear conversation using unified chat agent
-        result = unified_chat_agent.clear_conversation(session_id)
+        result = get_unified_chat_agent().clear_conversation(session_id)
         
         return {
             "success": True,
@@ -2571,7 +2594,7 @@ async def submit_contact_form(contact_request: ContactRequest):
         }
         
         # Save to database
-        success = data_source.save_enquiries_data(enquiry_data)
+        success = await asyncio.to_thread(data_source.save_enquiries_data, enquiry_data)
         
         if success:
             return {
@@ -2669,7 +2692,7 @@ async def delete_chat_history(session_id: str, user_id: str = None, user_type: s
                 raise HTTPException(status_code=404, detail="Chat session not found or access denied")
         
         # Delete the chat session
-        success = data_source.delete_chat_history_data(session_id)
+        success = await asyncio.to_thread(data_source.delete_chat_history_data, session_id)
         
         if success:
             return {"success": True, "message": "Chat session deleted successfully"}
@@ -2698,7 +2721,7 @@ async def delete_all_user_chat_history(user_id: str, user_type: str = "anonymous
         
         deleted_count = 0
         for _, chat in user_chats.iterrows():
-            success = data_source.delete_chat_history_data(chat['session_id'])
+            success = await asyncio.to_thread(data_source.delete_chat_history_data, chat['session_id'])
             if success:
                 deleted_count += 1
         
@@ -2716,8 +2739,7 @@ async def delete_all_user_chat_history(user_id: str, user_type: str = "anonymous
 async def isv_login_page():
     """Serve the ISV login page"""
     try:
-        with open("../frontend/isv_login.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("isv_login.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="ISV login page not found")
@@ -2728,8 +2750,7 @@ async def isv_login_page():
 async def isv_signup_page():
     """Serve the ISV signup page"""
     try:
-        with open("../frontend/isv_signup.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("isv_signup.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="ISV signup page not found")
@@ -2740,8 +2761,7 @@ async def isv_signup_page():
 async def isv_profile_page(isv_id: str):
     """Serve the ISV profile page"""
     try:
-        with open("../frontend/isv_profile.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("isv_profile.html")
         
         # Replace placeholder with actual ISV ID
         html_content = html_content.replace("{{isv_id}}", isv_id)
@@ -2760,8 +2780,7 @@ async def isv_profile_page(isv_id: str):
 async def admin_isv_page():
     """Serve the admin ISV management page"""
     try:
-        with open("../frontend/admin_isv.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_isv.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin ISV page not found")
@@ -2776,8 +2795,7 @@ async def admin_isv_page():
 async def reseller_login_page():
     """Reseller login page"""
     try:
-        with open("../frontend/reseller_login.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("reseller_login.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Reseller login page not found")
@@ -2788,8 +2806,7 @@ async def reseller_login_page():
 async def reseller_signup_page():
     """Reseller signup page"""
     try:
-        with open("../frontend/reseller_signup.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("reseller_signup.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Reseller signup page not found")
@@ -2800,8 +2817,7 @@ async def reseller_signup_page():
 async def reseller_profile_page(reseller_id: str):
     """Reseller profile page"""
     try:
-        with open("../frontend/reseller_profile.html", "r", encoding="utf-8") as f:
-            html_content = f.read().replace("{{reseller_id}}", reseller_id)
+        html_content = _frontend_page("reseller_profile.html").replace("{{reseller_id}}", reseller_id)
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Reseller profile page not found")
@@ -2812,8 +2828,7 @@ async def reseller_profile_page(reseller_id: str):
 async def admin_reseller_page():
     """Admin reseller management page"""
     try:
-        with open("../frontend/admin_reseller.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_reseller.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin reseller page not found")
@@ -2828,8 +2843,7 @@ async def admin_reseller_page():
 async def agent_onboard_page(isv_id: str):
     """Agent onboarding page for ISV"""
     try:
-        with open("../frontend/agent_onboard.html", "r", encoding="utf-8") as f:
-            html_content = f.read().replace("{{isv_id}}", isv_id)
+        html_content = _frontend_page("agent_onboard.html").replace("{{isv_id}}", isv_id)
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Agent onboard page not found")
@@ -2840,8 +2854,7 @@ async def agent_onboard_page(isv_id: str):
 async def admin_agents_page():
     """Admin agent management page"""
     try:
-        with open("../frontend/admin_agents.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_agents.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin agents page not found")
@@ -2852,8 +2865,7 @@ async def admin_agents_page():
 async def admin_login_page():
     """Admin login page"""
     try:
-        with open("../frontend/admin_login.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("admin_login.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Admin login page not found")
@@ -2864,8 +2876,7 @@ async def admin_login_page():
 async def simple_chat_page():
     """Simple AI Agent Chat page"""
     try:
-        with open("../frontend/simple_chat.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("simple_chat.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Chat page not found")
@@ -2880,8 +2891,7 @@ async def simple_chat_page():
 async def client_login_page():
     """Client login page"""
     try:
-        with open("../frontend/client_login.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("client_login.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Client login page not found")
@@ -2892,8 +2902,7 @@ async def client_login_page():
 async def client_signup_page():
     """Client signup page"""
     try:
-        with open("../frontend/client_signup.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content = _frontend_page("client_signup.html")
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Client signup page not found")
@@ -2904,8 +2913,7 @@ async def client_signup_page():
 async def client_profile_page(client_id: str):
     """Client profile page"""
     try:
-        with open("../frontend/client_profile.html", "r", encoding="utf-8") as f:
-            html_content = f.read().replace("{{client_id}}", client_id)
+        html_content = _frontend_page("client_profile.html").replace("{{client_id}}", client_id)
         return HTMLResponse(content=html_content)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Client profile page not found")
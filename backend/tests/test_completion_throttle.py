@@ -0,0 +1,81 @@
+"""
+Tests for the client-side limit on concurrent chat completion requests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from unified_chat import CompletionThrottle
+
+
+class FakeStream:
+    """Streamed response whose chunks arrive only when the test releases them"""
+
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+        self.release = asyncio.Event()
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        await self.release.wait()
+        self.events.append(f"{self.name} drained")
+        yield "chunk"
+
+
+class FakeClient:
+    """Stand-in for AsyncOpenAI that records when each request starts"""
+
+    def __init__(self):
+        self.events = []
+        self.streams = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.events.append(f"{request['name']} started")
+        stream = self.streams[request["name"]] = FakeStream(request["name"], self.events)
+        return stream
+
+
+async def read_stream(throttle, name):
+    async with throttle.completion(name=name) as stream:
+        return [chunk async for chunk in stream]
+
+
+def test_next_request_waits_until_the_stream_is_read():
+    async def scenario():
+        client = FakeClient()
+        throttle = CompletionThrottle(client, max_concurrency=1)
+        first = asyncio.create_task(read_stream(throttle, "first"))
+        second = asyncio.create_task(read_stream(throttle, "second"))
+        await asyncio.sleep(0.01)
+
+        assert client.events == ["first started"]  # The first stream still holds the only slot
+
+        client.streams["first"].release.set()
+        await first
+        await asyncio.sleep(0.01)
+        client.streams["second"].release.set()
+        await second
+        return client.events
+
+    assert asyncio.run(scenario()) == ["first started", "first drained", "second started", "second drained"]
+
+
+def test_slot_is_released_when_the_block_fails():
+    async def scenario():
+        client = FakeClient()
+        throttle = CompletionThrottle(client, max_concurrency=1)
+        with pytest.raises(RuntimeError):
+            async with throttle.completion(name="first"):
+                raise RuntimeError("client went away")
+
+        second = asyncio.create_task(read_stream(throttle, "second"))
+        await asyncio.sleep(0.01)
+        client.streams["second"].release.set()
+        return await asyncio.wait_for(second, 1)
+
+    assert asyncio.run(scenario()) == ["chunk"]
@@ -0,0 +1,78 @@
+"""
+Tests for the per-session conversation memory kept by the chat agent
+"""
+from unified_chat import UnifiedChatAgent
+
+
+def test_question_count_keeps_growing_past_the_history_window():
+    agent = UnifiedChatAgent()
+
+    counts = [agent.add_to_conversation_history("s1", f"q{i}", f"a{i}") for i in range(5)]
+
+    assert counts == [1, 2, 3, 4, 5]
+    assert len(agent.get_conversation_history("s1")) == 6  # still only the last 3 exchanges
+
+
+def test_question_count_is_per_session_and_reset_on_clear():
+    agent = UnifiedChatAgent()
+    agent.add_to_conversation_history("s1", "q", "a")
+    agent.add_to_conversation_history("s1", "q", "a")
+
+    assert agent.add_to_conversation_history("s2", "q", "a") == 1
+
+    agent.clear_conversation("s1")
+    assert agent.add_to_conversation_history("s1", "q", "a") == 1
+
+
+def test_completed_batches_are_bounded_and_expire():
+    agent = UnifiedChatAgent()
+    agent.max_completed_batches = 2
+    for number in range(3):
+        agent.remember_completed_batch(f"batch_{number}", {"session": number})
+
+    assert agent.get_completed_batch("batch_0") is None  # Least recently polled, evicted
+    assert agent.get_completed_batch("batch_2") == {"session": 2}
+
+    agent.completed_batch_ttl = -1  # Already expired when stored
+    agent.remember_completed_batch("batch_3", {})
+    assert agent.get_completed_batch("batch_3") is None
+
+
+def test_repeated_query_gets_a_copy_of_the_remembered_response():
+    agent = UnifiedChatAgent()
+    key = agent._dedupe_key("s1", "explore", "find an HR agent")
+    agent.remember_response(key, {"response": "Try the HR agent"})
+
+    first = agent.get_recent_response(key)
+    first["response"] = "changed by the caller"
+
+    assert agent.get_recent_response(key) == {"response": "Try the HR agent"}
+    assert agent.get_recent_response(agent._dedupe_key("s1", "explore", "find a sales agent")) is None
+    assert agent.get_recent_response(agent._dedupe_key("s2", "explore", "find an HR agent")) is None
+
+
+def test_remembered_responses_are_bounded_and_expire():
+    agent = UnifiedChatAgent()
+    agent.max_recent_responses = 2
+    keys = [agent._dedupe_key("s1", "explore", f"q{number}") for number in range(3)]
+    for number, key in enumerate(keys):
+        agent.remember_response(key, {"response": number})
+
+    assert agent.get_recent_response(keys[0]) is None  # Oldest, evicted
+    assert agent.get_recent_response(keys[2]) == {"response": 2}
+
+    agent.dedupe_ttl = -1  # Already expired when stored
+    agent.remember_response(keys[1], {"response": 1})
+    assert agent.get_recent_response(keys[1]) is None
+
+
+def test_clear_drops_the_sessions_remembered_responses():
+    agent = UnifiedChatAgent()
+    mine, theirs = agent._dedupe_key("s1", "explore", "q"), agent._dedupe_key("s2", "explore", "q")
+    agent.remember_response(mine, {"response": "a"})
+    agent.remember_response(theirs, {"response": "b"})
+
+    agent.clear_conversation("s1")
+
+    assert agent.get_recent_response(mine) is None
+    assert agent.get_recent_response(theirs) == {"response": "b"}
@@ -0,0 +1,77 @@
+"""
+Tests for locating and parsing the metadata JSON at the end of create mode responses
+"""
+from unified_chat import find_trailing_json_object, get_unified_chat_agent, split_streamed_text
+
+
+def trailing_object(text):
+    buf = text.encode("utf-8")
+    start, end = find_trailing_json_object(buf)
+    return None if start == -1 else buf[start:end].decode("utf-8")
+
+
+def test_braces_inside_string_values_are_ignored():
+    text = '{"lets_build": false, "gathered_info": {"name": "uses } brace"}}'
+    assert trailing_object(text) == text
+
+
+def test_escaped_quotes_inside_strings_do_not_end_the_string():
+    obj = '{"gathered_info": {"name": "say \\"hi\\" {"}}'
+    assert trailing_object("Sure.\n" + obj) == obj
+
+
+def test_lets_build_anchor_is_preferred():
+    obj = '{\n    "lets_build": true,\n    "gathered_info": {"agent_name": "A { B"}\n}'
+    assert trailing_object("Template {name} here.\n" + obj + "\nAnything else?") == obj
+
+
+def test_outermost_trailing_object_wins_over_narrative_braces():
+    obj = '{"lets_build": false, "gathered_info": {"agent_name": "HR"}}'
+    assert trailing_object("Use {placeholder} and an open { brace.\n" + obj) == obj
+
+
+def test_multibyte_text_before_the_object():
+    obj = '{"gathered_info": {"agent_name": "Café – résumé"}}'
+    assert trailing_object("Voilà ✓ " + obj) == obj
+
+
+def test_no_object():
+    assert trailing_object("No metadata here } {") is None
+
+
+def streamed_deltas(chunks):
+    """Replay achat_stream's create mode holdback over the given chunks and return the text it sends"""
+    sent, unsent, holding_back = [], "", False
+    for chunk in chunks:
+        if holding_back:
+            continue
+        content, unsent, holding_back = split_streamed_text(unsent + chunk)
+        sent.append(content)
+    if unsent and not holding_back:
+        sent.append(unsent)
+    return "".join(sent)
+
+
+def test_stream_sends_braces_before_the_metadata():
+    chunks = ["Fill in {agent_name} ", "and {persona}.\n", '{\n    "lets_build": false}']
+    assert streamed_deltas(chunks) == "Fill in {agent_name} and {persona}.\n"
+
+
+def test_stream_holds_back_an_anchor_split_across_chunks():
+    chunks = ["Great.\n{", "\n    \"lets", '_build": true, "gathered_info": {}}']
+    assert streamed_deltas(chunks) == "Great.\n"
+
+
+def test_stream_releases_a_trailing_brace_that_is_not_metadata():
+    assert streamed_deltas(["Ends with {", "x}", " and {"]) == "Ends with {x} and {"
+
+
+def test_parse_keeps_metadata_when_strings_contain_braces():
+    agent = get_unified_chat_agent()
+    response = 'Here is the summary.\n{"lets_build": false, "gathered_info": {"agent_name": "uses } brace"}}'
+
+    result = agent.parse_create_response_metadata(response, "tell me more")
+
+    assert result["response"] == "Here is the summary."
+    assert result["metadata"]["lets_build"] is False
+    assert result["metadata"]["gathered_info"]["agent_name"] == "uses } brace"
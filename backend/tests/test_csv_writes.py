@@ -0,0 +1,93 @@
+"""
+Tests for CSV mode writes from concurrent requests and for the table cache seeing them
+"""
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from data_source import data_source
+
+
+@pytest.fixture
+def chat_csv(tmp_path, monkeypatch):
+    csv_path = tmp_path / "chat_history.csv"
+    csv_path.write_text("session_id,user_id,created_at,updated_at,status\nseed,u0,,,active\n", encoding="utf-8")
+    monkeypatch.setattr(data_source, "csv_paths", {**data_source.csv_paths, "chat_history": csv_path})
+    return csv_path
+
+
+def run_concurrently(target, count):
+    start = threading.Barrier(count)
+
+    def worker(number):
+        start.wait()
+        target(number)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def read_rows(csv_path):
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+
+def test_concurrent_saves_keep_every_row(chat_csv):
+    results = []
+
+    def save(number):
+        row = {"session_id": f"s{number}", "user_id": f"u{number}"}
+        if number % 5 == 0:
+            row["agent_id"] = "agent_001"  # A new column forces a full rewrite instead of an append
+        results.append(data_source.save_chat_history_data(row))
+
+    run_concurrently(save, 20)
+
+    df = read_rows(chat_csv)
+    assert all(results)
+    assert sorted(df["session_id"]) == sorted(["seed"] + [f"s{number}" for number in range(20)])
+    assert set(df.loc[df["session_id"] == "s5", "agent_id"]) == {"agent_001"}
+    assert [path.name for path in chat_csv.parent.iterdir()] == ["chat_history.csv"]  # No temp files left behind
+
+
+def test_concurrent_updates_and_deletes_are_not_lost(chat_csv):
+    for number in range(10):
+        data_source.save_chat_history_data({"session_id": f"s{number}", "user_id": "old"})
+
+    def change(number):
+        if number % 2:
+            data_source.delete_chat_history_data(f"s{number}")
+        else:
+            data_source.update_chat_history_data(f"s{number}", {"user_id": f"new{number}"})
+
+    run_concurrently(change, 10)
+
+    df = read_rows(chat_csv).set_index("session_id")
+    assert sorted(df.index) == ["s0", "s2", "s4", "s6", "s8", "seed"]
+    assert [df.loc[f"s{number}", "user_id"] for number in range(0, 10, 2)] == ["new0", "new2", "new4", "new6", "new8"]
+    assert [path.name for path in chat_csv.parent.iterdir()] == ["chat_history.csv"]
+
+
+def test_cached_table_is_replaced_after_a_write(chat_csv, monkeypatch):
+    monkeypatch.setattr(data_source, "_table_cache_ttl", 30)
+    before = data_source.get_table_data("chat_history")
+    assert data_source.get_table_data("chat_history") is before  # Served from the cache within the TTL
+
+    data_source.save_chat_history_data({"session_id": "s1", "user_id": "u1"})
+
+    assert list(data_source.get_table_data("chat_history")["session_id"]) == ["seed", "s1"]
+
+
+def test_cached_table_is_replaced_after_the_file_changes(chat_csv, monkeypatch):
+    monkeypatch.setattr(data_source, "_table_cache_ttl", 30)
+    data_source.get_table_data("chat_history")
+
+    chat_csv.write_text("session_id,user_id,created_at,updated_at,status\nedited,u9,,,active\n", encoding="utf-8")
+    stat = chat_csv.stat()
+    os.utime(chat_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # Don't depend on the clock ticking
+
+    assert list(data_source.get_table_data("chat_history")["session_id"]) == ["edited"]
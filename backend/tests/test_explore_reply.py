@@ -0,0 +1,34 @@
+"""
+Tests for reading the structured explore reply, complete or cut off
+"""
+import orjson
+
+from unified_chat import get_unified_chat_agent, partial_explore_response
+
+
+def test_every_prefix_decodes_to_a_prefix_of_the_response():
+    reply = orjson.dumps({"response": 'Try "HR Screener" \\ café 😀\nnow', "mentioned_agent_ids": []}).decode()
+    reply = reply.replace("😀", "\\ud83d\\ude00")  # Escaped surrogate pair, as some encoders send it
+    final = orjson.loads(reply)["response"]
+
+    prefixes = [partial_explore_response(reply[:end]) or "" for end in range(len(reply) + 1)]
+
+    assert all(final.startswith(prefix) for prefix in prefixes)
+    assert prefixes[-1] == final
+
+
+def test_truncated_reply_keeps_the_text_that_arrived():
+    text, agent_ids = get_unified_chat_agent().parse_explore_response('{"response": "Try the HR agent and')
+
+    assert text == "Try the HR agent and"
+    assert agent_ids is None
+
+
+def test_json_without_response_text_gets_a_fallback_message():
+    text, _ = get_unified_chat_agent().parse_explore_response('{"mentioned_agent_ids": ["agent_0')
+
+    assert not text.startswith("{")
+
+
+def test_plain_text_reply_is_returned_unchanged():
+    assert get_unified_chat_agent().parse_explore_response("Plain answer") == ("Plain answer", None)
@@ -0,0 +1,125 @@
+"""
+Tests for the group commit of concurrent single-row inserts in data_source
+"""
+import threading
+import time
+
+from data_source import _InsertBatcher
+
+
+class RecordingInserts:
+    """insert_one/insert_many stand-ins that record calls; the first write blocks until released"""
+
+    def __init__(self, bad_ids=()):
+        self.bad_ids = set(bad_ids)
+        self.calls = []
+        self.writers = []  # Name of the thread that made each call
+        self.first_write_started = threading.Event()
+        self.release_first_write = threading.Event()
+
+    def _hold_first_write(self):
+        if not self.first_write_started.is_set():
+            self.first_write_started.set()
+            assert self.release_first_write.wait(5)
+
+    def insert_one(self, row):
+        self._hold_first_write()
+        self.calls.append(("one", row["id"]))
+        self.writers.append(threading.current_thread().name)
+        return row["id"] not in self.bad_ids
+
+    def insert_many(self, rows):
+        self._hold_first_write()
+        self.calls.append(("many", sorted(row["id"] for row in rows)))
+        self.writers.append(threading.current_thread().name)
+        return not any(row["id"] in self.bad_ids for row in rows)
+
+
+def submit_concurrently(batcher, inserts, follower_ids):
+    """Start one write, queue the followers behind it, then let the write finish"""
+    results = {}
+
+    def submit(row_id):
+        results[row_id] = batcher.submit({"id": row_id})
+
+    leader = threading.Thread(target=submit, args=(0,), name="leader")
+    leader.start()
+    assert inserts.first_write_started.wait(5)
+
+    followers = [threading.Thread(target=submit, args=(row_id,)) for row_id in follower_ids]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while len(batcher._pending) < len(follower_ids):
+        assert time.monotonic() < deadline, "followers never queued"
+        time.sleep(0.001)
+
+    inserts.release_first_write.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    return results
+
+
+def test_lone_insert_is_written_immediately():
+    inserts = RecordingInserts()
+    inserts.release_first_write.set()
+    batcher = _InsertBatcher(inserts.insert_one, inserts.insert_many)
+
+    assert batcher.submit({"id": 0}) is True
+    assert inserts.calls == [("one", 0)]
+
+
+def test_inserts_queued_behind_a_write_share_one_statement():
+    inserts = RecordingInserts()
+    batcher = _InsertBatcher(inserts.insert_one, inserts.insert_many)
+
+    results = submit_concurrently(batcher, inserts, [1, 2, 3, 4, 5])
+
+    assert results == {row_id: True for row_id in range(6)}
+    assert inserts.calls == [("one", 0), ("many", [1, 2, 3, 4, 5])]
+
+
+def test_failed_row_only_fails_its_own_caller():
+    inserts = RecordingInserts(bad_ids={3})
+    batcher = _InsertBatcher(inserts.insert_one, inserts.insert_many)
+
+    results = submit_concurrently(batcher, inserts, [1, 2, 3, 4])
+
+    assert results == {0: True, 1: True, 2: True, 3: False, 4: True}
+    # The shared statement failed, so its rows were retried one by one
+    assert inserts.calls[:2] == [("one", 0), ("many", [1, 2, 3, 4])]
+    assert sorted(inserts.calls[2:]) == [("one", 1), ("one", 2), ("one", 3), ("one", 4)]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    inserts = RecordingInserts()
+    batcher = _InsertBatcher(inserts.insert_one, inserts.insert_many, max_batch_size=2)
+
+    results = submit_concurrently(batcher, inserts, [1, 2, 3, 4, 5])
+
+    assert all(results.values())
+    assert [call[0] for call in inserts.calls] == ["one", "many", "many", "one"]
+
+
+def test_first_caller_only_writes_its_own_batch():
+    inserts = RecordingInserts()
+    batcher = _InsertBatcher(inserts.insert_one, inserts.insert_many)
+
+    submit_concurrently(batcher, inserts, [1, 2, 3])
+
+    # The queued rows are written by one of their own callers, not by the thread that was already writing
+    assert inserts.writers[0] == "leader"
+    assert inserts.writers[1] != "leader"
+
+
+def test_write_that_raises_does_not_block_later_inserts():
+    def broken_insert(row):
+        raise RuntimeError("connection lost")
+
+    batcher = _InsertBatcher(broken_insert, broken_insert)
+    assert batcher.submit({"id": 0}) is False
+
+    inserts = RecordingInserts()
+    inserts.release_first_write.set()
+    batcher.insert_one = inserts.insert_one
+    assert batcher.submit({"id": 1}) is True
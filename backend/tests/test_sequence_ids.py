@@ -0,0 +1,109 @@
+"""
+Tests for requirement and enquiry IDs: PostgreSQL sequences, and the highest existing ID in CSV mode
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from data_source import data_source
+
+
+class FakeCursor:
+    """Answers the sequence queries from a small in-memory state and records every statement"""
+
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def execute(self, sql, params=()):
+        self.db.statements.append(sql)
+        if sql.startswith("SELECT to_regclass"):
+            self.result = (params[0] if params[0] in self.db.sequences else None,)
+        elif sql.startswith("CREATE SEQUENCE"):
+            if self.db.create_fails:
+                raise RuntimeError("permission denied")
+            self.db.sequences[sql.split()[-1]] = 0
+        elif sql.startswith("SELECT COALESCE(MAX"):
+            self.result = (self.db.max_id,)
+        elif sql.startswith("SELECT CASE WHEN is_called"):
+            self.result = (self.db.sequences[sql.split()[-1]],)
+        elif sql.startswith("SELECT setval"):
+            self.db.sequences[params[0]] = params[1]
+        elif sql.startswith("SELECT nextval"):
+            self.db.sequences[params[0]] += 1
+            self.result = (self.db.sequences[params[0]],)
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Pooled connection stand-in holding the highest table ID and the sequences"""
+
+    def __init__(self, max_id=0, sequences=None, create_fails=False):
+        self.max_id = max_id
+        self.sequences = dict(sequences or {})
+        self.create_fails = create_fails
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    """Point the data source at a FakeDatabase; the test sets its state through the returned holder"""
+    holder = {}
+
+    @contextmanager
+    def conn():
+        yield holder["db"]
+
+    monkeypatch.setattr(data_source, "data_source", "postgres")
+    monkeypatch.setattr(data_source, "_conn", conn)
+    monkeypatch.setattr(data_source, "_sequences_ready", set())
+    return holder
+
+
+def test_missing_sequence_is_created_past_the_existing_ids(postgres):
+    db = postgres["db"] = FakeDatabase(max_id=41)
+
+    assert data_source.get_next_requirement_id() == "req_042"
+    assert data_source.get_next_requirement_id() == "req_043"
+    assert sum(sql.startswith("CREATE SEQUENCE") for sql in db.statements) == 1
+    assert sum(sql.startswith("SELECT COALESCE(MAX") for sql in db.statements) == 1  # Prepared once, then nextval only
+
+
+def test_existing_sequence_ahead_of_the_table_is_left_alone(postgres):
+    db = postgres["db"] = FakeDatabase(max_id=3, sequences={"enquiries_enquiry_id_seq": 9})
+
+    assert data_source._next_sequence_id("enquiries") == "enquiry_010"
+    assert not any(sql.startswith(("CREATE SEQUENCE", "SELECT setval")) for sql in db.statements)
+
+
+def test_failed_setup_raises_and_is_retried(postgres):
+    postgres["db"] = FakeDatabase(max_id=5, create_fails=True)
+
+    with pytest.raises(RuntimeError):
+        data_source.get_next_requirement_id()
+    assert "agent_requirements" not in data_source._sequences_ready
+
+    postgres["db"] = FakeDatabase(max_id=5)
+    assert data_source.get_next_requirement_id() == "req_006"
+
+
+def test_csv_ids_follow_the_highest_saved_id(tmp_path, monkeypatch):
+    csv_path = tmp_path / "agent_requirements.csv"
+    csv_path.write_text("requirement_id,user_id\nreq_007,u1\nreq_002,u2\nother_99,u3\n", encoding="utf-8")
+    monkeypatch.setattr(data_source, "csv_paths", {**data_source.csv_paths, "agent_requirements": csv_path})
+
+    assert data_source.get_next_requirement_id() == "req_008"
+    assert data_source.save_agent_requirements_data({"user_id": "u4"})
+    assert data_source.get_next_requirement_id() == "req_009"
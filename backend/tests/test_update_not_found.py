@@ -0,0 +1,51 @@
+"""
+Tests for updates that match no row: update_* returns False and the endpoints answer 404
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from data_source import data_source
+
+
+@pytest.fixture
+def isv_csv(tmp_path, monkeypatch):
+    csv_path = tmp_path / "isv.csv"
+    csv_path.write_text("isv_id,isv_name\nisv_001,Acme\n", encoding="utf-8")
+    monkeypatch.setattr(data_source, "csv_paths", {**data_source.csv_paths, "isv": csv_path})
+    return csv_path
+
+
+def test_update_reports_whether_a_row_matched(isv_csv):
+    assert data_source.update_isv_data("isv_404", {"isv_name": "Nobody"}) is False
+    assert data_source.update_isv_data("isv_001", {"isv_name": "Acme Corp"}) is True
+    assert "Acme Corp" in isv_csv.read_text(encoding="utf-8")
+
+
+def test_update_of_missing_row_is_404(monkeypatch):
+    monkeypatch.setattr(data_source, "update_agent_data", lambda agent_id, data: False)
+    monkeypatch.setattr(data_source, "get_agent_by_id", lambda agent_id: None)
+
+    response = TestClient(main.app).put("/api/admin/agents/agent_404", data={"admin_approved": "yes"})
+
+    assert response.status_code == 404
+
+
+def test_failed_update_of_existing_row_is_500(monkeypatch):
+    monkeypatch.setattr(data_source, "update_agent_data", lambda agent_id, data: False)
+    monkeypatch.setattr(data_source, "get_agent_by_id", lambda agent_id: {"agent_id": agent_id})
+
+    response = TestClient(main.app).put("/api/admin/agents/agent_001", data={"admin_approved": "yes"})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Failed to update agent approval status"
+
+
+def test_edit_of_agent_deleted_before_the_update_is_404(monkeypatch):
+    lookups = iter([{"agent_id": "agent_001", "isv_id": "isv_001"}, None])
+    monkeypatch.setattr(data_source, "get_agent_by_id", lambda agent_id: next(lookups))
+    monkeypatch.setattr(data_source, "update_agent_data", lambda agent_id, data: False)
+
+    response = TestClient(main.app).put("/api/agents/agent_001", data={"isv_id": "isv_001", "agent_name": "Renamed"})
+
+    assert response.status_code == 404
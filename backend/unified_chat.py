@@ -3,106 +3,37 @@ Unified Chat System for Agents Marketplace
 Single API endpoint that routes to different LLM agents based on mode
 """
 
-import json
+import asyncio
+import httpx
 import logging
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import orjson
+import re
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+from openai import OpenAI, AsyncOpenAI
 from datetime import datetime
-from collections import deque
-import uuid
+from collections import OrderedDict, deque
+from hashlib import blake2b
 import threading
+from contextlib import asynccontextmanager
+import time
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import os
 
-from config import OPENAI_API_KEY
+from config import OPENAI_API_KEY, CHAT_CONFIG
 from data_source import data_source
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Module logger - root logging is configured by the application (see main.py)
 logger = logging.getLogger(__name__)
 
-class UnifiedChatAgent:
-    def __init__(self):
-        """Initialize the unified chat agent with OpenAI client"""
-        self.client = None
-        self.api_key = OPENAI_API_KEY
-        self.conversation_memory = {}  # Store conversations by session_id
-        
-        # Log API key status
-        logger.info(f"OpenAI API Key Status: {'Present' if self.api_key else 'Missing'}")
-        if self.api_key:
-            logger.info(f"API Key Length: {len(self.api_key)} characters")
-            logger.info(f"API Key Prefix: {self.api_key[:10]}..." if len(self.api_key) > 10 else "API Key too short")
-        
-        # Initialize OpenAI client if API key is valid
-        if self.api_key and self.api_key != "your-openai-api-key-here":
-            try:
-                self.client = OpenAI(api_key=self.api_key)
-                logger.info("Unified Chat Agent OpenAI client initialized successfully")
-            except Exception as e:
-                logger.warning(f"Failed to initialize Unified Chat Agent OpenAI client: {str(e)}")
-                self.client = None
-        else:
-            logger.warning("No OpenAI API key provided - will use fallback responses only")
-    
-    def get_agents_context(self) -> str:
-        """Get formatted context about all available agents for explore mode"""
-        try:
-            agents_df = data_source.get_agents()
-            capabilities_df = data_source.get_capabilities_mapping()
-            
-            # Convert DataFrames to dictionaries for easier processing
-            agents_data = agents_df.to_dict('records') if not agents_df.empty else []
-            capabilities_data = capabilities_df.to_dict('records') if not capabilities_df.empty else []
-            
-            # Create capabilities lookup
-            capabilities_lookup = {}
-            for cap in capabilities_data:
-                agent_id = cap.get('agent_id')
-                if agent_id not in capabilities_lookup:
-                    capabilities_lookup[agent_id] = []
-                capabilities_lookup[agent_id].append(cap.get('by_capability', ''))
-            
-            # Format agents information
-            agents_context = []
-            for agent in agents_data:
-                if agent.get('admin_approved') == 'yes':  # Only include approved agents
-                    agent_id = agent.get('agent_id', '')
-                    agent_name = agent.get('agent_name', 'Unknown')
-                    description = agent.get('description', 'No description available')
-                    by_persona = agent.get('by_persona', 'General')
-                    by_value = agent.get('by_value', 'Value not specified')
-                    features = agent.get('features', 'No features listed')
-                    tags = agent.get('tags', 'No tags')
-                    
-                    # Get capabilities for this agent
-                    capabilities = capabilities_lookup.get(agent_id, [])
-                    capabilities_str = ', '.join(filter(None, capabilities)) if capabilities else 'No specific capabilities listed'
-                    
-                    agent_info = f"""
-Agent ID: {agent_id}
-Name: {agent_name}
-Description: {description}
-Target Persona: {by_persona}
-Value Proposition: {by_value}
-Features: {features}
-Tags: {tags}
-Capabilities: {capabilities_str}
----
-"""
-                    agents_context.append(agent_info)
-            
-            return '\n'.join(agents_context)
-            
-        except Exception as e:
-            logger.error(f"Error getting agents context: {str(e)}")
-            return "Error retrieving agents information."
-    
-    def get_explore_system_prompt(self) -> str:
-        """Get the system prompt for agent exploration"""
-        return """You are an AI assistant for the Agents Marketplace, a platform where users can discover and explore AI agents for various business needs.
+# Pooled keep-alive connections shared by all requests on a client; HTTP/2 multiplexes in-flight calls
+_OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0)
+# Long read timeout - BRD generation can take a while to produce its 4000 tokens
+_OPENAI_HTTP_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+
+# Explore mode system prompt; {agents_context} is filled with the (cached) agent catalog
+_EXPLORE_SYSTEM_PROMPT_TEMPLATE = """You are an AI assistant for the Agents Marketplace, a platform where users can discover and explore AI agents for various business needs.
 
 Your role is to:
 1. Help users understand which agents might be suitable for their needs
@@ -129,10 +60,32 @@ Guidelines:
 -Use bullet points to make the response more readable.
 
 Remember: You have access to detailed information about each agent including their descriptions, target personas, capabilities, and value propositions. Use this information to provide accurate and helpful recommendations."""
-    
-    def get_create_system_prompt(self) -> str:
-        """Get the system prompt for agent creation ideation and solution design"""
-        return """You are an AI agent ideation specialist. Your goal is to intelligently design custom AI agents by ideating solutions, proposing creative names, and filling gaps with intelligent assumptions.
+
+# Explore replies are structured so the mentioned agents come back as IDs rather than being
+# recovered by scanning the prose for agent names
+_EXPLORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "explore_reply",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "response": {"type": "string", "description": "The markdown-formatted reply shown to the user"},
+                "mentioned_agent_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Agent IDs of the agents the reply recommends or discusses"
+                }
+            },
+            "required": ["response", "mentioned_agent_ids"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Create mode system prompt is static, so it and its message dict are built once
+_CREATE_SYSTEM_PROMPT = """You are an AI agent ideation specialist. Your goal is to intelligently design custom AI agents by ideating solutions, proposing creative names, and filling gaps with intelligent assumptions.
 
 **Required Schema (7 fields):**
 1. agent_name: Creative, descriptive name (AUTO-ASSIGNED)
@@ -230,37 +183,614 @@ After your conversational response, you MUST include this exact JSON structure:
 
 **CRITICAL: Always include BOTH "lets_build" and "gathered_info" fields. Never just provide the gathered_info fields alone.**
 }"""
+_CREATE_SYSTEM_MESSAGE = {"role": "system", "content": _CREATE_SYSTEM_PROMPT}
+
+# User replies that confirm the proposed agent should be built
+_CONFIRMATION_PHRASES = ("yes", "confirm", "approve", "build it", "let's build", "sounds good", "perfect", "build", "proceed", "go ahead", "ok", "okay")
+# Whole-word match in one scan, so e.g. "book" no longer counts as "ok"
+_CONFIRMATION_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(phrase) for phrase in sorted(_CONFIRMATION_PHRASES, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+
+# Agent fields shown in the explore mode context, with fallbacks for columns the table lacks
+_AGENT_CONTEXT_COLUMNS = ("admin_approved", "agent_id", "agent_name", "description", "by_persona", "by_value", "features", "tags")
+_AGENT_CONTEXT_DEFAULTS = {
+    "agent_id": "",
+    "agent_name": "Unknown",
+    "description": "No description available",
+    "by_persona": "General",
+    "by_value": "Value not specified",
+    "features": "No features listed",
+    "tags": "No tags"
+}
+
+# Explore mode context block for a single agent, filled positionally from a record (minus admin_approved) plus its capabilities
+_AGENT_CONTEXT_TEMPLATE = """
+Agent ID: %s
+Name: %s
+Description: %s
+Target Persona: %s
+Value Proposition: %s
+Features: %s
+Tags: %s
+Capabilities: %s
+---
+"""
+
+# Word splitting and filler words ignored when ranking agents against a query
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_RELEVANCE_SKIP_WORDS = frozenset((
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'are', 'you', 'your', 'can', 'will', 'have',
+    'has', 'not', 'but', 'all', 'any', 'our', 'their', 'they', 'what', 'which', 'who', 'how', 'into',
+    'about', 'more', 'need', 'want', 'help', 'agent', 'agents', 'like', 'would', 'could', 'should'
+))
+
+# Generic request words left out of generated chat titles
+_TITLE_SKIP_WORDS = frozenset(('agent', 'build', 'create', 'help', 'need', 'want', 'for', 'to'))
+
+# Canned responses returned when the OpenAI call cannot be made
+_EXPLORE_ERROR_RESPONSE = "I'm currently unable to access our AI agent database. This might be due to a temporary service issue. Please try again in a few moments, or contact our support team if the problem persists."
+_CREATE_ERROR_RESPONSE = "I'm currently unable to process your agent creation request due to a technical issue. Our AI requirements analyst is temporarily unavailable. Please try again in a few moments, or contact our support team for assistance."
+_GENERIC_ERROR_RESPONSE = "I'm experiencing technical difficulties. Please try again or contact support."
+_EXPLORE_UNREADABLE_RESPONSE = "I wasn't able to finish that answer. Could you ask again, or narrow the question down a little?"
+
+# The 7 requirement fields gathered in create mode, in schema order
+_GATHERED_INFO_FIELDS = (
+    "agent_name",
+    "applicable_persona",
+    "applicable_industry",
+    "problem_statement",
+    "user_journeys",
+    "wow_factor",
+    "expected_output"
+)
+
+def normalize_gathered_info(raw: Any) -> Dict[str, str]:
+    """
+    Coerce model-provided gathered_info into the 7-field schema
+    
+    Missing fields default to "", lists are joined and other values are stringified;
+    keys outside the schema are dropped so they never reach the requirements table.
+    """
+    if not isinstance(raw, dict):
+        raw = {}
+    gathered_info = {}
+    for field in _GATHERED_INFO_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            value = ""
+        elif isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        elif not isinstance(value, str):
+            value = str(value)
+        gathered_info[field] = value
+    return gathered_info
+
+# Output budget for chat turns, bounded by what is left of gpt-4o-mini's context window
+_MAX_RESPONSE_TOKENS = 1500
+_MODEL_CONTEXT_TOKENS = 128000
+_CONTEXT_SAFETY_MARGIN = 100
+# Create prompt is static, so its rough token count (~4 characters per token) is taken once
+_CREATE_SYSTEM_PROMPT_TOKENS = len(_CREATE_SYSTEM_PROMPT) // 4
+
+def _now_iso() -> str:
+    """Current local time as an ISO 8601 string, matching the timestamps the data source writes"""
+    return datetime.now().isoformat(timespec="milliseconds")
+
+def completion_options(mode: str) -> Dict[str, Any]:
+    """Mode-specific chat completion arguments"""
+    if mode == "explore":
+        return {"response_format": _EXPLORE_RESPONSE_FORMAT}
+    return {}
+
+# Opening of the "response" string in a structured explore reply
+_EXPLORE_RESPONSE_FIELD = re.compile(r'"response"\s*:\s*"')
+
+def partial_explore_response(raw: str) -> Optional[str]:
+    """
+    Decoded text of the "response" field of a structured explore reply, also when the JSON is
+    incomplete (still streaming, or cut off at max_tokens); None if the field hasn't started
+    """
+    match = _EXPLORE_RESPONSE_FIELD.search(raw)
+    if not match:
+        return None
+    start = end = match.end()
+    # The string ends at the first quote not escaped by an odd run of backslashes
+    while True:
+        end = raw.find('"', end)
+        if end == -1:
+            end = len(raw)
+            break
+        backslashes = end - len(raw[start:end].rstrip("\\")) - start
+        if backslashes % 2 == 0:
+            break
+        end += 1
+    # A cut-off string can end inside an escape (at most "\uXXX"), so drop up to 6 characters until it decodes
+    body = raw[start:end]
+    for cut in range(7):
+        try:
+            return orjson.loads(f'"{body[:len(body) - cut]}"')
+        except orjson.JSONDecodeError:
+            continue
+    return None
+
+def response_token_budget(messages: List[Dict[str, str]]) -> int:
+    """Right-size max_tokens for a message list using a ~4 characters per token estimate"""
+    if messages and messages[0] is _CREATE_SYSTEM_MESSAGE:
+        used = _CREATE_SYSTEM_PROMPT_TOKENS + sum(len(message["content"]) // 4 for message in messages[1:])
+    else:
+        used = sum(len(message["content"]) // 4 for message in messages)
+    return max(1, min(_MAX_RESPONSE_TOKENS, _MODEL_CONTEXT_TOKENS - used - _CONTEXT_SAFETY_MARGIN))
+
+def trim_history_to_budget(history, max_tokens: int) -> List[Dict[str, str]]:
+    """Drop the oldest user/assistant pairs until the history fits a ~4 characters per token budget"""
+    messages = list(history)
+    used = sum(len(message["content"]) // 4 for message in messages)
+    start = 0
+    while used > max_tokens and start < len(messages):
+        # History is stored in user/assistant pairs, so whole exchanges are dropped together
+        used -= sum(len(message["content"]) // 4 for message in messages[start:start + 2])
+        start += 2
+    return messages[start:]
+
+def _empty_create_metadata() -> Dict[str, Any]:
+    """Fresh create mode metadata for responses without usable JSON (callers may mutate it)"""
+    return {"lets_build": False, "gathered_info": {}}
+
+# Create mode prompts the model to open its metadata object with this exact line
+_LETS_BUILD_ANCHOR = b'{\n    "lets_build"'
+_JSON_SCAN_TOKENS = re.compile(rb'[{}"\\]')
+
+def _matching_brace_end(buf: bytes, start: int) -> int:
+    """End offset (exclusive) of the JSON object opening at start, ignoring braces inside strings; -1 if it never closes"""
+    depth = 0
+    in_string = False
+    skip_at = -1  # Offset of the byte escaped by the previous backslash
+    for match in _JSON_SCAN_TOKENS.finditer(buf, start):
+        pos = match.start()
+        if pos == skip_at:
+            continue
+        token = buf[pos]
+        if in_string:
+            if token == 0x5C:  # backslash
+                skip_at = pos + 1
+            elif token == 0x22:  # closing quote
+                in_string = False
+        elif token == 0x22:
+            in_string = True
+        elif token == 0x7B:
+            depth += 1
+        elif token == 0x7D:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+    return -1
+
+def find_trailing_json_object(buf: bytes) -> Tuple[int, int]:
+    """
+    Locate the metadata JSON object in a UTF-8 encoded create mode response
+    
+    The object opening with the "lets_build" anchor is preferred. Otherwise the first balanced
+    object followed only by whitespace is taken (the outermost one, since candidates are tried
+    left to right), falling back to the balanced object that ends last. Braces and quotes inside
+    JSON strings are skipped, and all of them are single bytes in UTF-8, so the returned
+    (start, end) slice bounds fall on character boundaries. Returns (-1, -1) if there is none.
+    """
+    anchor = buf.find(_LETS_BUILD_ANCHOR)
+    if anchor != -1:
+        end = _matching_brace_end(buf, anchor)
+        if end != -1:
+            return anchor, end
+    
+    best = (-1, -1)
+    start = buf.find(b"{")
+    while start != -1:
+        end = _matching_brace_end(buf, start)
+        if end != -1:
+            if not buf[end:].strip():
+                return start, end
+            if end > best[1]:
+                best = (start, end)
+        start = buf.find(b"{", start + 1)
+    return best
+
+# Start of the metadata object in streamed text, with any whitespace the model puts before the key
+_STREAM_METADATA_START = re.compile(r'\{\s*"lets_build"')
+_LETS_BUILD_KEY = '"lets_build"'
+
+def split_streamed_text(unsent: str) -> Tuple[str, str, bool]:
+    """
+    Split create mode text that has not been streamed yet into (send, keep, metadata_started)
+    
+    Everything before the metadata object is sent. When the object has not started, a trailing
+    "{" that the next chunk could still turn into the anchor is kept back; other braces (such as
+    template placeholders in the reply) are sent straight away.
+    """
+    match = _STREAM_METADATA_START.search(unsent)
+    if match:
+        return unsent[:match.start()], unsent[match.start():], True
+    brace = unsent.rfind("{")
+    if brace != -1 and _LETS_BUILD_KEY.startswith(unsent[brace + 1:].lstrip()):
+        return unsent[:brace], unsent[brace:], False
+    return unsent, "", False
+
+def collect_stream_text(stream) -> str:
+    """Join the content deltas of a streamed chat completion"""
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts)
+
+async def acollect_stream_text(stream) -> str:
+    """Join the content deltas of an async streamed chat completion"""
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts)
+
+class CompletionThrottle:
+    """
+    Send chat completion requests as soon as they arrive, within client-side limits
+    
+    At most max_concurrency requests are in flight at once (a streamed request keeps its slot
+    until its body has been read) and, when requests_per_minute is set, starts are spread to
+    stay under that rate instead of running into 429s (which the client would otherwise retry
+    with backoff).
+    """
+    
+    def __init__(self, client: AsyncOpenAI, max_concurrency: int = 20, requests_per_minute: int = 0):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._loop = None
+        self._semaphore = None
+        self._request_times = deque()  # Loop times of requests started in the last minute
+    
+    def _ensure_loop_state(self):
+        """Create the semaphore on the running event loop (recreated if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._request_times.clear()
+    
+    @asynccontextmanager
+    async def completion(self, **request) -> AsyncIterator[Any]:
+        """
+        Send one chat completion request once a concurrency slot and the per-minute budget allow it
+        
+        The slot is held until the async with block exits, so read a streamed response inside it.
+        """
+        self._ensure_loop_state()
+        async with self._semaphore:
+            await self._wait_for_rate_budget()
+            yield await self.client.chat.completions.create(**request)
+    
+    async def _wait_for_rate_budget(self):
+        """Sleep until starting another request keeps within requests_per_minute"""
+        if not self.requests_per_minute:
+            return
+        while True:
+            now = self._loop.time()
+            while self._request_times and self._request_times[0] <= now - 60:
+                self._request_times.popleft()
+            if len(self._request_times) < self.requests_per_minute:
+                self._request_times.append(now)
+                return
+            await asyncio.sleep(self._request_times[0] + 60 - now)
+
+class UnifiedChatAgent:
+    def __init__(self):
+        """Initialize the unified chat agent with OpenAI client"""
+        self.client = None
+        self.async_client = None
+        self.completion_throttle = None
+        self.api_key = OPENAI_API_KEY
+        self.conversation_memory = OrderedDict()  # Store conversations by session_id, least recently used first
+        self.max_sessions = CHAT_CONFIG["max_sessions"]
+        self.session_ttl = CHAT_CONFIG["session_ttl_seconds"]
+        self.session_last_seen: Dict[str, float] = {}  # session_id -> monotonic time of last use
+        self.session_question_counts: Dict[str, int] = {}  # session_id -> exchanges so far (the history deque only keeps the last 3)
+        self.history_token_budget = CHAT_CONFIG["history_token_budget"]  # Soft cap on history sent per turn; the deque maxlen stays the hard cap
+        self.memory_lock = threading.Lock()  # Guards conversation memory and recent_responses; achat() works on them from worker threads
+        self._agents_context_cache = None  # Formatted explore context, rebuilt when the data source version changes
+        self._agents_context_version = None
+        self._explore_system_message = (None, None)  # (full agents context, explore system message built from it)
+        self._agent_blocks: Dict[tuple, str] = {}  # (agent row, capabilities) -> formatted context block
+        self._agent_catalog: List[tuple] = []  # (block, summary line, search words, lowercased name) per approved agent
+        self.explore_top_k = CHAT_CONFIG["explore_top_k"]
+        self.explore_context_max_tokens = CHAT_CONFIG["explore_context_max_tokens"]
+        self._agent_name_index = None  # (lowercased agent name, agent ID) pairs for explore mode matching
+        self._agent_name_index_version = None
+        self.recent_responses = OrderedDict()  # (session_id, mode, query digest) -> (expires_at, result) for retried requests
+        self.dedupe_ttl = CHAT_CONFIG["dedupe_ttl_seconds"]
+        self.max_recent_responses = CHAT_CONFIG["dedupe_max_entries"]
+        self.completed_batches = OrderedDict()  # batch_id -> (expires_at, results already saved), so polling again saves nothing twice
+        self.completed_batch_ttl = CHAT_CONFIG["completed_batch_ttl_seconds"]
+        self.max_completed_batches = CHAT_CONFIG["completed_batch_max_entries"]
+        
+        # Log API key status
+        logger.info(f"OpenAI API Key Status: {'Present' if self.api_key else 'Missing'}")
+        
+        # Initialize OpenAI client if API key is valid
+        if self.api_key and self.api_key != "your-openai-api-key-here":
+            try:
+                self.client = OpenAI(
+                    api_key=self.api_key,
+                    max_retries=CHAT_CONFIG["openai_max_retries"],
+                    http_client=httpx.Client(http2=True, limits=_OPENAI_HTTP_LIMITS, timeout=_OPENAI_HTTP_TIMEOUT)
+                )
+                self.async_client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    max_retries=CHAT_CONFIG["openai_max_retries"],
+                    http_client=httpx.AsyncClient(http2=True, limits=_OPENAI_HTTP_LIMITS, timeout=_OPENAI_HTTP_TIMEOUT)
+                )
+                self.completion_throttle = CompletionThrottle(
+                    self.async_client,
+                    max_concurrency=CHAT_CONFIG["openai_concurrency"],
+                    requests_per_minute=CHAT_CONFIG["openai_requests_per_minute"]
+                )
+                logger.info("Unified Chat Agent OpenAI client initialized successfully")
+            except Exception as e:
+                logger.warning(f"Failed to initialize Unified Chat Agent OpenAI client: {str(e)}")
+                self.client = None
+                self.async_client = None
+                self.completion_throttle = None
+        else:
+            logger.warning("No OpenAI API key provided - will use fallback responses only")
+    
+    def get_agents_context(self) -> str:
+        """Get formatted context about all available agents for explore mode"""
+        try:
+            # The context only changes when agents or capabilities are written
+            version = data_source.get_table_version("agents", "capabilities_mapping")
+            if self._agents_context_cache is not None and version == self._agents_context_version:
+                return self._agents_context_cache
+            
+            agent_rows = data_source.get_table_records("agents", _AGENT_CONTEXT_COLUMNS, _AGENT_CONTEXT_DEFAULTS)
+            capabilities_lookup = data_source.get_capabilities_lookup()
+            
+            # Format agents information, reusing the block of every agent whose row and capabilities are unchanged
+            agents_context = []
+            agent_blocks = {}
+            agent_catalog = []
+            for row in agent_rows:
+                admin_approved, agent_id, agent_name, description, by_persona, by_value, features, tags = row
+                if admin_approved == 'yes':  # Only include approved agents
+                    # Get capabilities for this agent
+                    capabilities_str = capabilities_lookup.get(agent_id, 'No specific capabilities listed')
+                    
+                    block_key = (row, capabilities_str)
+                    agent_info = self._agent_blocks.get(block_key)
+                    if agent_info is None:
+                        agent_info = _AGENT_CONTEXT_TEMPLATE % (*row[1:], capabilities_str)
+                    agent_blocks[block_key] = agent_info
+                    agents_context.append(agent_info)
+                    
+                    # Search terms and one-line summary used when the catalog has to be pruned
+                    search_text = ' '.join(str(value) for value in (agent_name, description, by_persona, by_value, features, tags, capabilities_str)).lower()
+                    search_words = frozenset(word for word in _WORD_PATTERN.findall(search_text) if len(word) > 2 and word not in _RELEVANCE_SKIP_WORDS)
+                    short_description = str(description).strip().replace('\n', ' ')
+                    if len(short_description) > 120:
+                        short_description = short_description[:117] + '...'
+                    summary_line = f"- {agent_name} (Agent ID: {agent_id}): {short_description}"
+                    agent_catalog.append((agent_info, summary_line, search_words, str(agent_name).lower()))
+            
+            self._agent_blocks = agent_blocks  # Blocks of removed or changed agents drop out here
+            self._agent_catalog = agent_catalog
+            self._agents_context_cache = '\n'.join(agents_context)
+            self._agents_context_version = version
+            return self._agents_context_cache
+            
+        except Exception as e:
+            logger.error(f"Error getting agents context: {str(e)}")
+            return "Error retrieving agents information."
+    
+    def get_relevant_agents_context(self, query_text: str) -> str:
+        """
+        Get the explore mode agents context, pruned to the most relevant agents when the catalog is large
+        
+        If the full context fits the token budget it is returned as is. Otherwise agents are ranked
+        by how many of their search terms appear in the query text; the top ones keep their full
+        block and every other agent is listed by name and a one-line description.
+        
+        Args:
+            query_text: Current query plus recent conversation, used to rank agents
+            
+        Returns:
+            Formatted agents context for the explore system prompt
+        """
+        full_context = self.get_agents_context()
+        agent_catalog = self._agent_catalog
+        if len(full_context) // 4 <= self.explore_context_max_tokens or not agent_catalog:
+            return full_context
+        
+        query_lower = query_text.lower()
+        query_words = {word for word in _WORD_PATTERN.findall(query_lower) if len(word) > 2 and word not in _RELEVANCE_SKIP_WORDS}
+        scored = []
+        for position, (agent_info, summary_line, search_words, agent_name_lower) in enumerate(agent_catalog):
+            score = len(query_words & search_words)
+            if agent_name_lower and agent_name_lower in query_lower:
+                score += 100  # Agents named in the conversation always make the cut
+            scored.append((-score, position))
+        scored.sort()
+        
+        # Full blocks for the top ranked agents, within the token budget
+        budget_chars = self.explore_context_max_tokens * 4
+        detailed_positions = set()
+        detailed_blocks = []
+        used_chars = 0
+        for negative_score, position in scored[:self.explore_top_k]:
+            agent_info = agent_catalog[position][0]
+            if detailed_blocks and used_chars + len(agent_info) > budget_chars:
+                break
+            detailed_positions.add(position)
+            detailed_blocks.append(agent_info)
+            used_chars += len(agent_info)
+        
+        # Every other agent stays discoverable through a one-line summary
+        summary_lines = [entry[1] for position, entry in enumerate(agent_catalog) if position not in detailed_positions]
+        context = '\n'.join(detailed_blocks)
+        if summary_lines:
+            context += "\nOther available agents (summary only - ask about one for full details):\n" + '\n'.join(summary_lines)
+        return context
+    
+    def get_explore_system_prompt(self) -> str:
+        """Get the system prompt for agent exploration"""
+        return _EXPLORE_SYSTEM_PROMPT_TEMPLATE
+    
+    def get_create_system_prompt(self) -> str:
+        """Get the system prompt for agent creation ideation and solution design"""
+        return _CREATE_SYSTEM_PROMPT
+    
+    def _expire_sessions(self, now: float):
+        """Drop sessions idle for longer than the TTL (caller holds memory_lock)"""
+        # Memory is in least recently used order, so expired sessions are always at the front
+        cutoff = now - self.session_ttl
+        while self.conversation_memory:
+            oldest_session_id = next(iter(self.conversation_memory))
+            if self.session_last_seen.get(oldest_session_id, 0) >= cutoff:
+                break
+            self.conversation_memory.popitem(last=False)
+            self.session_last_seen.pop(oldest_session_id, None)
+            self.session_question_counts.pop(oldest_session_id, None)
+    
+    def _get_session_history(self, session_id: str) -> Optional[deque]:
+        """Get a live session's history deque and mark it as recently used (caller holds memory_lock)"""
+        now = time.monotonic()
+        self._expire_sessions(now)
+        history = self.conversation_memory.get(session_id)
+        if history is not None:
+            self.conversation_memory.move_to_end(session_id)
+            self.session_last_seen[session_id] = now
+        return history
     
     def get_conversation_history(self, session_id: str) -> List[Dict[str, str]]:
         """Get conversation history for a session (max 3 conversations)"""
-        if session_id in self.conversation_memory:
-            return list(self.conversation_memory[session_id])
-        return []
-    
-    def add_to_conversation_history(self, session_id: str, user_message: str, assistant_response: str):
-        """Add message to conversation history (maintain max 6 messages)"""
-        if session_id not in self.conversation_memory:
-            self.conversation_memory[session_id] = deque(maxlen=6)  # 3 conversations = 6 messages
+        with self.memory_lock:
+            history = self._get_session_history(session_id)
+            return list(history) if history is not None else []
+    
+    def add_to_conversation_history(self, session_id: str, user_message: str, assistant_response: str) -> int:
+        """Add message to conversation history (maintain max 6 messages) and return the session's exchange count"""
+        with self.memory_lock:
+            history = self._get_session_history(session_id)
+            if history is None:
+                history = self.conversation_memory[session_id] = deque(maxlen=6)  # 3 conversations = 6 messages
+                self.session_last_seen[session_id] = time.monotonic()
+                
+                # Evict least recently used sessions to keep memory bounded
+                while len(self.conversation_memory) > self.max_sessions:
+                    evicted_session_id, _ = self.conversation_memory.popitem(last=False)
+                    self.session_last_seen.pop(evicted_session_id, None)
+                    self.session_question_counts.pop(evicted_session_id, None)
+            
+            history.extend(({"role": "user", "content": user_message}, {"role": "assistant", "content": assistant_response}))
+            question_count = self.session_question_counts[session_id] = self.session_question_counts.get(session_id, 0) + 1
+            return question_count
+    
+    def _dedupe_key(self, session_id: str, mode: str, user_query: str) -> Tuple[str, str, bytes]:
+        """Key identifying a repeated query within a session"""
+        return session_id, mode, blake2b(user_query.encode("utf-8"), digest_size=16).digest()
+    
+    def get_recent_response(self, key: Tuple[str, str, bytes]) -> Optional[Dict[str, Any]]:
+        """Return the result of an identical request answered within the dedupe TTL, if any"""
+        with self.memory_lock:
+            entry = self.recent_responses.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                self.recent_responses.pop(key, None)
+                return None
+        return dict(result)
+    
+    def remember_response(self, key: Tuple[str, str, bytes], result: Dict[str, Any]):
+        """Keep a successful result briefly so client retries don't trigger another OpenAI call"""
+        with self.memory_lock:
+            self.recent_responses[key] = (time.monotonic() + self.dedupe_ttl, result)
+            self.recent_responses.move_to_end(key)
+            while len(self.recent_responses) > self.max_recent_responses:
+                self.recent_responses.popitem(last=False)
+    
+    def get_completed_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Return the saved results of a batch polled to completion within the TTL, if any"""
+        with self.memory_lock:
+            entry = self.completed_batches.get(batch_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.completed_batches[batch_id]
+                return None
+            self.completed_batches.move_to_end(batch_id)
+            return entry[1]
+    
+    def remember_completed_batch(self, batch_id: str, results: Dict[str, Any]):
+        """Keep a completed batch's results so later polls return them instead of saving the turns again"""
+        with self.memory_lock:
+            now = time.monotonic()
+            self.completed_batches[batch_id] = (now + self.completed_batch_ttl, results)
+            self.completed_batches.move_to_end(batch_id)
+            # Least recently polled first, so expired or surplus batches are dropped from the front
+            while self.completed_batches and (
+                len(self.completed_batches) > self.max_completed_batches
+                or next(iter(self.completed_batches.values()))[0] < now
+            ):
+                self.completed_batches.popitem(last=False)
+    
+    def get_agent_name_index(self) -> List[Tuple[str, str]]:
+        """Get (lowercased agent name, agent ID) pairs in catalog order, rebuilt when agents change"""
+        version = data_source.get_table_version("agents")
+        if self._agent_name_index is not None and version == self._agent_name_index_version:
+            return self._agent_name_index
         
-        self.conversation_memory[session_id].append({"role": "user", "content": user_message})
-        self.conversation_memory[session_id].append({"role": "assistant", "content": assistant_response})
+        agent_name_index = []
+        for agent_name, agent_id in data_source.get_table_records("agents", ("agent_name", "agent_id")):
+            agent_name = str(agent_name).lower() if agent_name is not None else ''
+            if agent_name and agent_id:
+                agent_name_index.append((agent_name, agent_id))
+        
+        self._agent_name_index = agent_name_index
+        self._agent_name_index_version = version
+        return agent_name_index
+    
+    def parse_explore_response(self, ai_response: str) -> Tuple[str, Optional[List[str]]]:
+        """
+        Split a structured explore reply into its text and mentioned agent IDs
+        
+        Returns:
+            (response text, agent IDs) - the IDs are None when the reply is not the expected
+            JSON. Then the text is whatever the "response" field holds (the JSON may have been
+            cut off at max_tokens), a fallback message for other JSON, or plain text unchanged.
+        """
+        try:
+            reply = orjson.loads(ai_response)
+        except orjson.JSONDecodeError:
+            reply = None
+        if not isinstance(reply, dict) or not isinstance(reply.get("response"), str):
+            if not ai_response.lstrip().startswith("{"):
+                return ai_response, None
+            logger.warning("Explore reply is not complete structured JSON, keeping the text that arrived")
+            return partial_explore_response(ai_response) or _EXPLORE_UNREADABLE_RESPONSE, None
+        
+        # Only keep IDs of agents that actually exist, in the order the model gave them
+        known_agent_ids = {agent_id for _, agent_id in self.get_agent_name_index()}
+        mentioned_agent_ids = []
+        for agent_id in reply.get("mentioned_agent_ids") or []:
+            if agent_id in known_agent_ids and agent_id not in mentioned_agent_ids:
+                mentioned_agent_ids.append(agent_id)
+        return reply["response"], mentioned_agent_ids
     
     def extract_agent_ids_from_response(self, ai_response: str) -> List[str]:
         """Extract mentioned agent IDs from the AI response (for explore mode)"""
         try:
-            agents_df = data_source.get_agents()
-            agents_data = agents_df.to_dict('records') if not agents_df.empty else []
-            mentioned_agents = []
+            response_lower = ai_response.lower()
             
             # Look for agent names in the response and match to IDs
-            for agent in agents_data:
-                agent_name = str(agent.get('agent_name', '')).lower()
-                agent_id = agent.get('agent_id', '')
-                
-                if agent_name and agent_id and agent_name in ai_response.lower():
-                    mentioned_agents.append(agent_id)
-            
-            return mentioned_agents
+            return [agent_id for agent_name, agent_id in self.get_agent_name_index() if agent_name in response_lower]
             
         except Exception as e:
             logger.error(f"Error extracting agent IDs: {str(e)}")
@@ -269,80 +799,43 @@ After your conversational response, you MUST include this exact JSON structure:
     def parse_create_response_metadata(self, ai_response: str, user_query: str = "") -> Dict[str, Any]:
         """Extract metadata from create mode AI response"""
         try:
-            # First try to find JSON at the end of the response
-            if "{" in ai_response and "}" in ai_response:
-                # Find the JSON object that contains "lets_build"
-                json_start = ai_response.find('{\n    "lets_build"')
-                if json_start == -1:
-                    # Fallback: find the last complete JSON object
-                    json_start = ai_response.rfind("{")
-                json_str = ai_response[json_start:]
-                
-                # Try to find the end of the JSON object (handle nested objects)
-                brace_count = 0
-                json_end = -1
-                in_string = False
-                escape_next = False
-                
-                for i, char in enumerate(json_str):
-                    if escape_next:
-                        escape_next = False
-                        continue
-                        
-                    if char == '\\':
-                        escape_next = True
-                        continue
-                        
-                    if char == '"' and not escape_next:
-                        in_string = not in_string
-                        continue
-                        
-                    if not in_string:
-                        if char == "{":
-                            brace_count += 1
-                        elif char == "}":
-                            brace_count -= 1
-                            if brace_count == 0:
-                                json_end = i + 1
-                                break
-                
-                if json_end > 0:
-                    json_str = json_str[:json_end]
-                    try:
-                        metadata = json.loads(json_str)
-                        # Check if metadata has the expected structure
-                        if "lets_build" not in metadata:
-                            # AI only provided gathered_info, add missing fields
-                            original_metadata = metadata.copy()
-                            metadata = {
-                                "lets_build": False,
-                                "gathered_info": original_metadata
-                            }
-                        
-                        # Check if this is a confirmation response and override lets_build
-                        confirmation_phrases = ["yes", "confirm", "approve", "build it", "let's build", "sounds good", "perfect", "build", "proceed", "go ahead", "ok", "okay"]
-                        if any(phrase in user_query.lower() for phrase in confirmation_phrases):
-                            metadata["lets_build"] = True
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON parsing error: {str(e)}")
-                        logger.error(f"JSON string: {json_str}")
+            # First try to find JSON at the end of the response (scanned as UTF-8 bytes, which orjson parses directly)
+            response_bytes = ai_response.encode("utf-8")
+            json_start, json_end = find_trailing_json_object(response_bytes)
+            if json_start != -1:
+                json_bytes = response_bytes[json_start:json_end]
+                try:
+                    metadata = orjson.loads(json_bytes)
+                    # Check if metadata has the expected structure
+                    if "lets_build" not in metadata:
+                        # AI only provided gathered_info, add missing fields
+                        original_metadata = metadata.copy()
                         metadata = {
                             "lets_build": False,
-                            "gathered_info": {}
+                            "gathered_info": original_metadata
                         }
+                    metadata["gathered_info"] = normalize_gathered_info(metadata.get("gathered_info"))
                     
-                    # Remove JSON from the main response
-                    clean_response = ai_response[:json_start].strip()
-                    
-                    return {
-                        "response": clean_response,
-                        "metadata": metadata
-                    }
+                    # Check if this is a confirmation response and override lets_build
+                    if _CONFIRMATION_PATTERN.search(user_query):
+                        metadata["lets_build"] = True
+                except orjson.JSONDecodeError as e:
+                    logger.error(f"JSON parsing error: {str(e)}")
+                    logger.error(f"JSON string: {json_bytes.decode('utf-8')}")
+                    metadata = _empty_create_metadata()
+                
+                # Remove JSON from the main response
+                clean_response = response_bytes[:json_start].decode("utf-8").strip()
+                
+                return {
+                    "response": clean_response,
+                    "metadata": metadata
+                }
             
             # If no JSON found, try to parse structured format
             if ("**Agent Name:**" in ai_response or "1. **Agent Name:**" in ai_response or 
                 "HR Candidate Filter" in ai_response or "applicable persona" in ai_response.lower()):
-                gathered_info = self.extract_gathered_info_from_any_format(ai_response)
+                gathered_info = normalize_gathered_info(self.extract_gathered_info_from_any_format(ai_response))
                 lets_build = "prototype" in ai_response.lower() and ("create" in ai_response.lower() or "proceed" in ai_response.lower())
                 
                 return {
@@ -356,19 +849,13 @@ After your conversational response, you MUST include this exact JSON structure:
             # If no structured data found, return the original response
             return {
                 "response": ai_response,
-                "metadata": {
-                    "lets_build": False,
-                    "gathered_info": {}
-                }
+                "metadata": _empty_create_metadata()
             }
         except Exception as e:
             logger.error(f"Error parsing create response metadata: {str(e)}")
             return {
                 "response": ai_response,
-                "metadata": {
-                    "lets_build": False,
-                    "gathered_info": {}
-                }
+                "metadata": _empty_create_metadata()
             }
     
     def extract_gathered_info_from_any_format(self, ai_response: str) -> Dict[str, str]:
@@ -725,53 +1212,51 @@ Return the complete document with all sections."""
         except Exception as e:
             logger.error(f"Error starting BRD generation: {str(e)}")
     
-    def get_error_response(self, mode: str, error_message: str = None) -> Dict[str, Any]:
+    def get_error_response(self, mode: str, error_message: str = None, timestamp: Optional[str] = None) -> Dict[str, Any]:
         """Generate error response when OpenAI is not available"""
+        timestamp = timestamp or _now_iso()
         try:
             if mode == "explore":
-                response = "I'm currently unable to access our AI agent database. This might be due to a temporary service issue. Please try again in a few moments, or contact our support team if the problem persists."
-                
                 return {
-                    "response": response,
+                    "response": _EXPLORE_ERROR_RESPONSE,
                     "filtered_agents": [],
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": timestamp,
                     "error": error_message or "OpenAI API unavailable"
                 }
             
             else:  # create mode
-                response = "I'm currently unable to process your agent creation request due to a technical issue. Our AI requirements analyst is temporarily unavailable. Please try again in a few moments, or contact our support team for assistance."
-                
                 return {
-                    "response": response,
+                    "response": _CREATE_ERROR_RESPONSE,
                     "lets_build": False,
                     "gathered_info": {},
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": timestamp,
                     "error": error_message or "OpenAI API unavailable"
                 }
             
         except Exception as e:
             logger.error(f"Error in error response: {str(e)}")
             return {
-                "response": "I'm experiencing technical difficulties. Please try again or contact support.",
+                "response": _GENERIC_ERROR_RESPONSE,
                 "lets_build": False,
                 "gathered_info": {},
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "error": str(e)
             }
     
-    def save_chat_history(self, session_id: str, user_id: str, user_type: str, mode: str, user_query: str, response: str) -> bool:
+    def save_chat_history(self, session_id: str, user_id: str, user_type: str, mode: str, user_query: str, response: str, timestamp: Optional[str] = None) -> bool:
         """Save or update chat history for a session with full conversation JSON"""
+        timestamp = timestamp or _now_iso()
         try:
-            # Get the full conversation history from memory
-            full_conversation = self.get_conversation_history(session_id) if session_id in self.conversation_memory else []
-            
-            # Add current messages to conversation
-            conversation_with_current = full_conversation.copy()
-            conversation_with_current.append({"role": "user", "content": user_query})
-            conversation_with_current.append({"role": "assistant", "content": response})
+            # Full conversation history from memory plus the current messages
+            with self.memory_lock:
+                conversation_with_current = [
+                    *self.conversation_memory.get(session_id, ()),
+                    {"role": "user", "content": user_query},
+                    {"role": "assistant", "content": response}
+                ]
             
             # Convert to JSON for storage
-            conversation_json = json.dumps(conversation_with_current)
+            conversation_json = orjson.dumps(conversation_with_current).decode("utf-8")
             
             # Check if session already exists
             chat_history_df = data_source.get_chat_history()
@@ -788,7 +1273,7 @@ Return the complete document with all sections."""
                 
                 updated_data = {
                     'total_messages': current_messages + 1,
-                    'last_message_at': datetime.now().isoformat(),
+                    'last_message_at': timestamp,
                     'conversation_summary': conversation_json  # Store full conversation as JSON
                 }
                 return data_source.update_chat_history_data(session_id, updated_data)
@@ -802,7 +1287,7 @@ Return the complete document with all sections."""
                     'title': self._generate_chat_title(user_query),
                     'conversation_summary': conversation_json,  # Store full conversation as JSON
                     'total_messages': 1,
-                    'last_message_at': datetime.now().isoformat()
+                    'last_message_at': timestamp
                 }
                 return data_source.save_chat_history_data(chat_data)
                 
@@ -813,14 +1298,13 @@ Return the complete document with all sections."""
     def _generate_chat_title(self, user_query: str) -> str:
         """Generate a title for the chat based on the first query"""
         try:
-            # Extract key words from the query
-            words = user_query.lower().split()
+            # Extract key words from the query (only the first 10 words are considered)
+            words = user_query.lower().split(maxsplit=10)
             key_words = []
             
             # Look for important keywords
-            important_words = ['agent', 'build', 'create', 'help', 'need', 'want', 'for', 'to']
             for word in words[:10]:  # First 10 words
-                if word not in important_words and len(word) > 3:
+                if word not in _TITLE_SKIP_WORDS and len(word) > 3:
                     key_words.append(word)
             
             if key_words:
@@ -855,6 +1339,95 @@ Return the complete document with all sections."""
             logger.error(f"Error saving agent requirements: {str(e)}")
             return False
     
+    def _build_messages(self, user_query: str, mode: str, session_id: str) -> List[Dict[str, str]]:
+        """Build the OpenAI message list (system prompt, history, current query) for a mode"""
+        # Prepare system message for OpenAI based on mode
+        if mode == "explore":
+            # Rank the catalog against the current query and the recent conversation
+            with self.memory_lock:
+                recent_text = ' '.join(message["content"] for message in self._get_session_history(session_id) or ())
+            agents_context = self.get_relevant_agents_context(f"{user_query} {recent_text}")
+            
+            # The unpruned context is the same cached string until the catalog changes, so its message is reused
+            cached_context, system_message = self._explore_system_message
+            if agents_context is not cached_context:
+                system_message = {"role": "system", "content": _EXPLORE_SYSTEM_PROMPT_TEMPLATE.format(agents_context=agents_context)}
+                if agents_context is self._agents_context_cache:
+                    self._explore_system_message = (agents_context, system_message)
+        else:  # create mode
+            system_message = _CREATE_SYSTEM_MESSAGE
+        
+        # System prompt, conversation history (oldest exchanges trimmed to the token budget), then the current user message
+        with self.memory_lock:
+            conversation_history = trim_history_to_budget(self._get_session_history(session_id) or (), self.history_token_budget)
+        return [system_message, *conversation_history, {"role": "user", "content": user_query}]
+    
+    def _build_chat_result(self, ai_response: str, user_query: str, mode: str, session_id: str, user_id: Optional[str], user_type: Optional[str], timestamp: str) -> Dict[str, Any]:
+        """Save history and turn the raw AI response into the mode-specific chat result"""
+        # Process response based on mode
+        if mode == "explore":
+            # Structured reply carries the agent IDs; plain text falls back to matching agent names
+            ai_response, filtered_agents = self.parse_explore_response(ai_response)
+            if filtered_agents is None:
+                filtered_agents = self.extract_agent_ids_from_response(ai_response)
+            
+            # Save chat history
+            self.save_chat_history(session_id, user_id or "anonymous", user_type or "anonymous", mode, user_query, ai_response, timestamp)
+            
+            # Add to conversation history
+            self.add_to_conversation_history(session_id, user_query, ai_response)
+            
+            # Format and return response
+            result = {
+                "response": ai_response,
+                "filtered_agents": filtered_agents,
+                "session_id": session_id,
+                "timestamp": timestamp
+            }
+            
+        else:  # create mode
+            # Save chat history
+            self.save_chat_history(session_id, user_id or "anonymous", user_type or "anonymous", mode, user_query, ai_response, timestamp)
+            
+            # Parse response and metadata
+            parsed_response = self.parse_create_response_metadata(ai_response, user_query)
+            
+            # Add to conversation history
+            question_count = self.add_to_conversation_history(session_id, user_query, parsed_response["response"])
+            
+            # Format final result
+            metadata = parsed_response["metadata"]
+            result = {
+                "response": parsed_response["response"],
+                "lets_build": metadata.get("lets_build", False),
+                "gathered_info": metadata.get("gathered_info", {}),
+                "question_count": question_count,
+                "session_id": session_id,
+                "timestamp": timestamp
+            }
+            
+            # If the conversation is complete and user wants to build, save requirements
+            if result.get("lets_build") and result.get("gathered_info"):
+                gathered_info = result["gathered_info"]
+                # Only save if we have meaningful information
+                if any(value.strip() for value in gathered_info.values() if isinstance(value, str)):
+                    save_success = self.save_agent_requirements(gathered_info, session_id, user_id, user_type)
+                    result["requirements_saved"] = save_success
+                    
+                    # Trigger async BRD generation (doesn't block response)
+                    brd_filename = self.generate_brd_document_async(gathered_info, session_id, user_id, user_type)
+                    
+                    # Add BRD download link and generation status to result
+                    result["brd_download_url"] = f"/api/brd/{session_id}"
+                    result["brd_status"] = "generating"  # Indicates BRD is being generated
+                    if brd_filename:
+                        result["brd_filename"] = brd_filename
+                    logger.info(f"BRD download link added for session {session_id}, status: generating")
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Unified chat response generated for mode {mode}, session {session_id}")
+        return result
+    
     def chat(self, user_query: str, mode: str = "explore", session_id: Optional[str] = None, user_id: Optional[str] = None, user_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Main unified chat function that handles both explore and create modes
@@ -869,151 +1442,395 @@ Return the complete document with all sections."""
         Returns:
             Dict containing response, metadata, and session info
         """
+        # One timestamp for everything this request returns or saves
+        timestamp = _now_iso()
         try:
             # Generate session ID if not provided
             if not session_id:
-                session_id = str(uuid.uuid4())
+                session_id = os.urandom(16).hex()
+            
+            # A retry of a request that was just answered gets the same result back
+            dedupe_key = self._dedupe_key(session_id, mode, user_query)
+            recent_result = self.get_recent_response(dedupe_key)
+            if recent_result is not None:
+                logger.info(f"Returning recent response for repeated query in session {session_id}")
+                return recent_result
             
             # Check if OpenAI client is available
             if not self.client:
                 logger.warning("OpenAI client not available, returning error response")
-                result = self.get_error_response(mode, "OpenAI API key not available")
+                result = self.get_error_response(mode, "OpenAI API key not available", timestamp)
                 result["session_id"] = session_id
                 logger.info(f"Error response generated: response_length={len(result.get('response', ''))}, mode={mode}")
                 return result
             
-            # Get conversation history
-            conversation_history = self.get_conversation_history(session_id)
-            
-            # Get conversation history for create mode
-            
-            # Prepare messages for OpenAI based on mode
-            if mode == "explore":
-                agents_context = self.get_agents_context()
-                system_prompt = self.get_explore_system_prompt().format(agents_context=agents_context)
-            else:  # create mode
-                system_prompt = self.get_create_system_prompt()
-            
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Add conversation history
-            messages.extend(conversation_history)
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_query})
+            messages = self._build_messages(user_query, mode, session_id)
             
             # Call OpenAI API
-            logger.info(f"Sending unified chat request for mode {mode}, session {session_id}")
-            logger.info(f"API Key being used: {'Yes' if self.api_key else 'No'}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Sending unified chat request for mode {mode}, session {session_id}")
+                logger.info(f"API Key being used: {'Yes' if self.api_key else 'No'}")
             try:
                 response = self.client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=messages,
-                    max_tokens=1500,
-                    temperature=0.7
+                    max_tokens=response_token_budget(messages),
+                    temperature=0.7,
+                    stream=True,
+                    **completion_options(mode)
                 )
-                logger.info(f"OpenAI API call successful for mode {mode}")
+                
+                # Extract AI response as it streams in
+                ai_response = collect_stream_text(response)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"OpenAI API call successful for mode {mode}")
             except Exception as api_error:
                 logger.error(f"OpenAI API call failed: {str(api_error)}")
                 raise api_error
             
-            # Extract AI response
-            ai_response = response.choices[0].message.content
+            result = self._build_chat_result(ai_response, user_query, mode, session_id, user_id, user_type, timestamp)
+            self.remember_response(dedupe_key, result)
+            return result
             
-            # Save chat history
-            self.save_chat_history(session_id, user_id or "anonymous", user_type or "anonymous", mode, user_query, ai_response)
+        except Exception as e:
+            logger.error(f"Error in unified chat function: {str(e)}")
+            # Return error response on any failure
+            result = self.get_error_response(mode, str(e), timestamp)
+            result["session_id"] = session_id
+            return result
+    
+    async def achat(self, user_query: str, mode: str = "explore", session_id: Optional[str] = None, user_id: Optional[str] = None, user_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of chat() for use inside the event loop
+        
+        The OpenAI call goes through the completion throttle, so concurrent sessions
+        share the async client's connections instead of blocking one another, and
+        the data source reads and writes around it run in worker threads.
+        Arguments and return value are the same as chat().
+        """
+        # One timestamp for everything this request returns or saves
+        timestamp = _now_iso()
+        try:
+            # Generate session ID if not provided
+            if not session_id:
+                session_id = os.urandom(16).hex()
             
-            # Process response based on mode
-            if mode == "explore":
-                # Extract relevant agent IDs from the response
-                filtered_agents = self.extract_agent_ids_from_response(ai_response)
-                
-                # Add to conversation history
-                self.add_to_conversation_history(session_id, user_query, ai_response)
-                
-                # Format and return response
-                result = {
-                    "response": ai_response,
-                    "filtered_agents": filtered_agents,
-                    "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-            else:  # create mode
-                # Parse response and metadata
-                parsed_response = self.parse_create_response_metadata(ai_response, user_query)
-                
-                # Add to conversation history
-                self.add_to_conversation_history(session_id, user_query, parsed_response["response"])
-                
-                # Format final result
-                metadata = parsed_response["metadata"]
-                result = {
-                    "response": parsed_response["response"],
-                    "lets_build": metadata.get("lets_build", False),
-                    "gathered_info": metadata.get("gathered_info", {}),
-                    "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                # If the conversation is complete and user wants to build, save requirements
-                if result.get("lets_build") and result.get("gathered_info"):
-                    gathered_info = result["gathered_info"]
-                    # Only save if we have meaningful information
-                    if any(value.strip() for value in gathered_info.values() if isinstance(value, str)):
-                        save_success = self.save_agent_requirements(gathered_info, session_id, user_id, user_type)
-                        result["requirements_saved"] = save_success
-                        
-                        # Trigger async BRD generation (doesn't block response)
-                        brd_filename = self.generate_brd_document_async(gathered_info, session_id, user_id, user_type)
-                        
-                        # Add BRD download link and generation status to result
-                        result["brd_download_url"] = f"/api/brd/{session_id}"
-                        result["brd_status"] = "generating"  # Indicates BRD is being generated
-                        if brd_filename:
-                            result["brd_filename"] = brd_filename
-                        logger.info(f"BRD download link added for session {session_id}, status: generating")
+            # A retry of a request that was just answered gets the same result back
+            dedupe_key = self._dedupe_key(session_id, mode, user_query)
+            recent_result = self.get_recent_response(dedupe_key)
+            if recent_result is not None:
+                logger.info(f"Returning recent response for repeated query in session {session_id}")
+                return recent_result
             
-            logger.info(f"Unified chat response generated for mode {mode}, session {session_id}")
+            # Check if OpenAI client is available
+            if not self.completion_throttle:
+                logger.warning("OpenAI client not available, returning error response")
+                result = self.get_error_response(mode, "OpenAI API key not available", timestamp)
+                result["session_id"] = session_id
+                logger.info(f"Error response generated: response_length={len(result.get('response', ''))}, mode={mode}")
+                return result
+            
+            # Agent catalog reads and history saves are blocking I/O, so they run off the event loop
+            messages = await asyncio.to_thread(self._build_messages, user_query, mode, session_id)
+            
+            # Call OpenAI API
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Sending unified chat request for mode {mode}, session {session_id}")
+            try:
+                async with self.completion_throttle.completion(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    max_tokens=response_token_budget(messages),
+                    temperature=0.7,
+                    stream=True,
+                    **completion_options(mode)
+                ) as response:
+                    # Extract AI response as it streams in
+                    ai_response = await acollect_stream_text(response)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"OpenAI API call successful for mode {mode}")
+            except Exception as api_error:
+                logger.error(f"OpenAI API call failed: {str(api_error)}")
+                raise api_error
+            
+            result = await asyncio.to_thread(self._build_chat_result, ai_response, user_query, mode, session_id, user_id, user_type, timestamp)
+            self.remember_response(dedupe_key, result)
             return result
             
         except Exception as e:
             logger.error(f"Error in unified chat function: {str(e)}")
             # Return error response on any failure
-            result = self.get_error_response(mode, str(e))
+            result = self.get_error_response(mode, str(e), timestamp)
             result["session_id"] = session_id
             return result
     
+    async def achat_stream(self, user_query: str, mode: str = "explore", session_id: Optional[str] = None, user_id: Optional[str] = None, user_type: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of achat()
+        
+        Yields {"type": "delta", "content": ...} events while the reply is generated, then one
+        {"type": "done", "data": result} event carrying the same result achat() returns. In
+        create mode the trailing metadata JSON (from its "lets_build" key on) is held back from
+        the deltas. Explore replies use the same structured JSON as achat(), and the deltas carry
+        the text of its "response" field as it is decoded.
+        """
+        # One timestamp for everything this request returns or saves
+        timestamp = _now_iso()
+        try:
+            # Generate session ID if not provided
+            if not session_id:
+                session_id = os.urandom(16).hex()
+            
+            # A retry of a request that was just answered gets the same result back
+            dedupe_key = self._dedupe_key(session_id, mode, user_query)
+            recent_result = self.get_recent_response(dedupe_key)
+            if recent_result is not None:
+                yield {"type": "done", "data": recent_result}
+                return
+            
+            # Check if OpenAI client is available
+            if not self.completion_throttle:
+                logger.warning("OpenAI client not available, returning error response")
+                result = self.get_error_response(mode, "OpenAI API key not available", timestamp)
+                result["session_id"] = session_id
+                yield {"type": "done", "data": result}
+                return
+            
+            messages = await asyncio.to_thread(self._build_messages, user_query, mode, session_id)
+            
+            # Call OpenAI API
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Sending streamed unified chat request for mode {mode}, session {session_id}")
+            parts = []
+            unsent = ""  # Create mode text held back in case it starts the metadata object
+            holding_back = False
+            explore_sent = 0  # Length of the explore "response" text already sent
+            async with self.completion_throttle.completion(
+                model="gpt-4o-mini",
+                messages=messages,
+                max_tokens=response_token_budget(messages),
+                temperature=0.7,
+                stream=True,
+                **completion_options(mode)
+            ) as stream:
+                # Forward deltas as they arrive, keeping the full text for parsing and history
+                async for chunk in stream:
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    parts.append(content)
+                    if holding_back:
+                        continue
+                    if mode == "explore":
+                        text = partial_explore_response("".join(parts)) or ""
+                        content = text[explore_sent:]
+                        explore_sent = len(text)
+                    else:
+                        content, unsent, holding_back = split_streamed_text(unsent + content)
+                    if content:
+                        yield {"type": "delta", "content": content}
+            # A brace kept back at the end never became the metadata object, so it is part of the reply
+            if unsent and not holding_back:
+                yield {"type": "delta", "content": unsent}
+            
+            result = await asyncio.to_thread(self._build_chat_result, "".join(parts), user_query, mode, session_id, user_id, user_type, timestamp)
+            self.remember_response(dedupe_key, result)
+            yield {"type": "done", "data": result}
+            
+        except Exception as e:
+            logger.error(f"Error in streamed unified chat function: {str(e)}")
+            # Finish the stream with an error response on any failure
+            result = self.get_error_response(mode, str(e), timestamp)
+            result["session_id"] = session_id
+            yield {"type": "done", "data": result}
+    
+    async def achat_many(self, queries: List[Tuple[str, str]], mode: str = "create", max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Run independent chat turns concurrently
+        
+        Args:
+            queries: List of (session_id, user_query) pairs, one per session
+            mode: "explore" or "create"
+            max_concurrency: Maximum number of turns in flight at once
+        
+        Returns:
+            Chat results in the same order as queries
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(session_id: str, user_query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.achat(user_query, mode, session_id)
+        
+        return await asyncio.gather(*[run_one(session_id, user_query) for session_id, user_query in queries])
+    
+    def chat_many(self, queries: List[Tuple[str, str]], mode: str = "create", max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """Blocking wrapper around achat_many() for scripts and callers outside the event loop"""
+        return asyncio.run(self.achat_many(queries, mode, max_concurrency))
+    
+    def submit_requirements_batch(self, queries: List[Tuple[str, str]]) -> Optional[str]:
+        """
+        Submit create mode turns through the OpenAI Batch API
+        
+        Batch requests are billed at a discount and bypass the synchronous rate limits,
+        but complete within a 24h window - only use this for non-interactive flows.
+        
+        Args:
+            queries: List of (session_id, user_query) pairs, one per session
+            
+        Returns:
+            Batch ID to pass to poll_batch(), or None if submission failed
+        """
+        if not self.client:
+            logger.warning("OpenAI client not available, cannot submit requirements batch")
+            return None
+        
+        try:
+            session_ids = [session_id for session_id, _ in queries]
+            if len(set(session_ids)) != len(session_ids):
+                logger.error("Requirements batch contains duplicate session IDs")
+                return None
+            
+            # One chat completion request per line, keyed by session
+            lines = []
+            for session_id, user_query in queries:
+                messages = self._build_messages(user_query, "create", session_id)
+                lines.append(orjson.dumps({
+                    "custom_id": session_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": "gpt-4o-mini",
+                        "messages": messages,
+                        "max_tokens": response_token_budget(messages),
+                        "temperature": 0.7
+                    }
+                }))
+            
+            batch_file = self.client.files.create(
+                file=("requirements_batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted requirements batch {batch.id} with {len(lines)} requests")
+            return batch.id
+            
+        except Exception as e:
+            logger.error(f"Error submitting requirements batch: {str(e)}")
+            return None
+    
+    def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Check a requirements batch and, once completed, fold its results into the sessions
+        
+        Completed turns are saved like interactive ones: chat history, conversation memory and,
+        when the user is ready to build, the gathered requirements and BRD. Batch turns have no
+        user, so they are saved as anonymous.
+        
+        Returns:
+            Dict with the batch status and, when completed, per-session results keyed by session_id
+        """
+        if not self.client:
+            return {"batch_id": batch_id, "status": "error", "error": "OpenAI API key not available"}
+        
+        results = self.get_completed_batch(batch_id)
+        if results is not None:
+            return {"batch_id": batch_id, "status": "completed", "results": results}
+        
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status != "completed":
+                return {"batch_id": batch_id, "status": batch.status}
+            
+            # Recover each session's query from the submitted input file
+            user_queries = {}
+            for line in self.client.files.content(batch.input_file_id).text.splitlines():
+                if line.strip():
+                    request = orjson.loads(line)
+                    user_queries[request["custom_id"]] = request["body"]["messages"][-1]["content"]
+            
+            results = {}
+            timestamp = _now_iso()
+            if batch.output_file_id:
+                for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    output = orjson.loads(line)
+                    session_id = output["custom_id"]
+                    response = output.get("response") or {}
+                    if output.get("error") or response.get("status_code") != 200:
+                        results[session_id] = {"error": output.get("error") or response.get("body")}
+                        continue
+                    
+                    user_query = user_queries.get(session_id, "")
+                    ai_response = response["body"]["choices"][0]["message"]["content"]
+                    results[session_id] = self._build_chat_result(ai_response, user_query, "create", session_id, None, None, timestamp)
+            
+            self.remember_completed_batch(batch_id, results)
+            logger.info(f"Requirements batch {batch_id} completed with {len(results)} results")
+            return {"batch_id": batch_id, "status": batch.status, "results": results}
+            
+        except Exception as e:
+            logger.error(f"Error polling requirements batch {batch_id}: {str(e)}")
+            return {"batch_id": batch_id, "status": "error", "error": str(e)}
+    
     def clear_conversation(self, session_id: str) -> Dict[str, Any]:
         """Clear conversation history for a session"""
-        if session_id in self.conversation_memory:
-            del self.conversation_memory[session_id]
+        with self.memory_lock:
+            self.conversation_memory.pop(session_id, None)
+            self.session_last_seen.pop(session_id, None)
+            self.session_question_counts.pop(session_id, None)
+            for key in [key for key in self.recent_responses if key[0] == session_id]:
+                del self.recent_responses[key]
         
         return {
             "message": "Conversation history cleared",
             "session_id": session_id,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_iso()
         }
 
-# Global unified chat agent instance
-unified_chat_agent = UnifiedChatAgent()
+# Global unified chat agent instance, created on first use so importing this module stays cheap
+_unified_chat_agent: Optional[UnifiedChatAgent] = None
+_unified_chat_agent_lock = threading.Lock()
+
+def get_unified_chat_agent() -> UnifiedChatAgent:
+    """Return the process-wide unified chat agent, creating it on first call"""
+    global _unified_chat_agent
+    if _unified_chat_agent is None:
+        with _unified_chat_agent_lock:
+            if _unified_chat_agent is None:
+                _unified_chat_agent = UnifiedChatAgent()
+    return _unified_chat_agent
 
 # Example usage and testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Test the unified chat agent
     print("🤖 Testing Unified Chat Agent...")
     
+    unified_chat_agent = get_unified_chat_agent()
+    
+    async def run_tests():
+        # The two test sessions are independent, so their OpenAI calls overlap
+        return await asyncio.gather(
+            unified_chat_agent.achat("I need help with financial analysis", "explore"),
+            unified_chat_agent.achat("I need an AI agent for customer support", "create")
+        )
+    
+    explore_response, create_response = asyncio.run(run_tests())
+    
     # Test explore mode
     print("\n=== EXPLORE MODE TEST ===")
-    response = unified_chat_agent.chat("I need help with financial analysis", "explore")
-    print(f"Response: {response['response']}")
-    print(f"Filtered Agents: {response.get('filtered_agents', [])}")
+    print(f"Response: {explore_response['response']}")
+    print(f"Filtered Agents: {explore_response.get('filtered_agents', [])}")
     
     # Test create mode
     print("\n=== CREATE MODE TEST ===")
-    response = unified_chat_agent.chat("I need an AI agent for customer support", "create")
-    print(f"Response: {response['response']}")
-    print(f"Let's Build: {response.get('lets_build', False)}")
-    print(f"Gathered Info: {response.get('gathered_info', {})}")
+    print(f"Response: {create_response['response']}")
+    print(f"Let's Build: {create_response.get('lets_build', False)}")
+    print(f"Gathered Info: {create_response.get('gathered_info', {})}")